@@ -1,9 +1,11 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Iterable, List, Literal, Optional, Tuple, Union
 
 import anndata as ad
 import pandas as pd
+import pyarrow as pa
 from lamin_utils import logger
 from lamindb_setup._init_instance import register_storage
 from lamindb_setup.dev import StorageSettings
@@ -16,11 +18,22 @@ from lnschema_core.types import AnnDataLike, DataLike, FieldAttr, VisibilityChoi
 from lamindb._utils import attach_func_to_class_method
 from lamindb.dev._data import _track_run_input
 from lamindb.dev._mapped_dataset import MappedDataset
-from lamindb.dev.storage._backed_access import AnnDataAccessor, BackedAccessor
+from lamindb.dev.storage import load_to_memory
+from lamindb.dev.storage._arrow import (
+    FilterType,
+    load_parquet_dataset,
+    scan_parquet_dataset,
+)
+from lamindb.dev.storage._backed_access import (
+    AnnDataAccessor,
+    AnnDataConcatAccessor,
+    BackedAccessor,
+)
+from lamindb.dev.storage.file import filepath_from_file
 from lamindb.dev.versioning import get_ids_from_old_version, init_uid
 
 from . import _TESTING, File, Run
-from ._file import parse_feature_sets_from_anndata
+from ._file import parse_feature_sets_from_anndata, pin_files, stage_files
 from ._registry import init_self_from_db
 from .dev._data import (
     add_transform_to_kwargs,
@@ -318,7 +331,7 @@ def from_files(files: Iterable[File]) -> Tuple[str, Dict[str, str]]:
     # validate consistency of hashes
     # we do not allow duplicate hashes
     logger.debug("hashes")
-    # file.hash is None for zarr
+    # file.hash is None for zarr stores written from memory
     # todo: more careful handling of such cases
     hashes = [file.hash for file in files if file.hash is not None]
     if len(hashes) != len(set(hashes)):
@@ -344,25 +357,152 @@ def mapped(
 ) -> "MappedDataset":
     _track_run_input(self, is_run_input)
     path_list = []
+    files_to_stage = []
     for file in self.files.all():
         if file.suffix not in {".h5ad", ".zrad", ".zarr"}:
             logger.warning(f"Ignoring file with suffix {file.suffix}")
             continue
         elif not stream and file.suffix == ".h5ad":
-            path_list.append(file.stage())
+            files_to_stage.append(file)
+            path_list.append(None)
         else:
             path_list.append(file.path)
-    return MappedDataset(path_list, label_keys, encode_labels)
+    # the mapped dataset pins the files itself once it's created
+    with pin_files(files_to_stage):
+        # download all files concurrently
+        staged_paths = iter(stage_files(files_to_stage))
+        path_list = [next(staged_paths) if path is None else path for path in path_list]
+        return MappedDataset(path_list, label_keys, encode_labels)
+
+
+def stage(
+    self, max_workers: Optional[int] = None, is_run_input: Optional[bool] = None
+) -> List[Path]:
+    """Download all files of the dataset to the cache.
+
+    Files are downloaded concurrently, files that are up-to-date in the cache
+    are skipped.
+
+    Args:
+        max_workers: The maximal number of concurrent downloads.
+        is_run_input: Whether to track this dataset as run input.
+
+    Returns:
+        The local paths of the files.
+
+    Examples:
+
+        >>> paths = dataset.stage()
+    """
+    _track_run_input(self, is_run_input)
+    if self.file is not None:
+        files = [self.file]
+    else:
+        files = self.files.all().list()
+    return stage_files(files, max_workers=max_workers)
+
+
+def scan(
+    self,
+    columns: Optional[List[str]] = None,
+    filter: Optional["FilterType"] = None,
+    batch_size: Optional[int] = None,
+    is_run_input: Optional[bool] = None,
+) -> "pa.dataset.Scanner":
+    """Scan a dataset of parquet files without loading it.
+
+    The files are read directly from storage as a pyarrow dataset. Only the
+    requested `columns` are read and `filter` skips row groups based on their
+    statistics.
+
+    Args:
+        columns: The columns to read, all columns if `None`.
+        filter: A pyarrow expression or filters as in `pyarrow.parquet`,
+            e.g., `[("cell_type", "==", "T cell")]`.
+        batch_size: The maximal number of rows of a record batch.
+        is_run_input: Whether to track this dataset as run input.
+
+    Returns:
+        A `pyarrow.dataset.Scanner`, call `.to_table()` to read the result or
+        `.to_batches()` to stream it.
+
+    Examples:
+
+        >>> import pyarrow.dataset as ds
+        >>> scanner = dataset.scan(columns=["a"], filter=ds.field("b") > 1)
+        >>> for batch in scanner.to_batches():
+        ...     process(batch)
+    """
+    _track_run_input(self, is_run_input)
+    if self.file is not None:
+        files = [self.file]
+    else:
+        files = self.files.all().list()
+    if any(file.suffix != ".parquet" for file in files):
+        raise RuntimeError("Can only scan datasets of parquet files")
+    filepaths = [filepath_from_file(file) for file in files]
+    return scan_parquet_dataset(
+        filepaths, columns=columns, filter=filter, batch_size=batch_size
+    )
 
 
 # docstring handled through attach_func_to_class_method
 def backed(
     self, is_run_input: Optional[bool] = None
-) -> Union["AnnDataAccessor", "BackedAccessor"]:
+) -> Union["AnnDataAccessor", "BackedAccessor", "AnnDataConcatAccessor"]:
     _track_run_input(self, is_run_input)
-    if self.file is None:
-        raise RuntimeError("Can only call backed() for datasets with a single file")
-    return self.file.backed()
+    if self.file is not None:
+        return self.file.backed(is_run_input=False)
+    all_files = self.files.all()
+    accessors = []
+    try:
+        for file in all_files:
+            # only the dataset is tracked as a run input, not its files
+            accessor = file.backed(is_run_input=False)
+            accessors.append(accessor)
+            if not isinstance(accessor, AnnDataAccessor):
+                raise RuntimeError(
+                    "Can only call backed() for datasets with a single file or with"
+                    " AnnData files"
+                )
+    except Exception:
+        for accessor in accessors:
+            accessor.close()
+        raise
+    # the files are concatenated lazily
+    return AnnDataConcatAccessor(accessors, keys=[file.uid for file in all_files])
+
+
+def _load_files(
+    all_files: List[File], suffix: str, join: Literal["inner", "outer"], **kwargs
+) -> DataLike:
+    if suffix not in {".zarr", ".zrad"}:
+        # download all files concurrently before loading them
+        filepaths = stage_files(all_files)
+    else:
+        filepaths = [filepath_from_file(file) for file in all_files]
+    concat_object = None
+    if suffix == ".parquet" and set(kwargs) <= {"columns"}:
+        try:
+            concat_object = load_parquet_dataset(filepaths, join=join, **kwargs)
+        # e.g. columns with conflicting types or files with different indices
+        except (pa.ArrowException, ValueError) as e:
+            logger.warning(f"couldn't load files as an arrow dataset: {e}")
+    if concat_object is None:
+        with ThreadPoolExecutor() as executor:
+            objects = list(
+                executor.map(
+                    lambda filepath: load_to_memory(filepath, **kwargs), filepaths
+                )
+            )
+        file_uids = [file.uid for file in all_files]
+        if isinstance(objects[0], pd.DataFrame):
+            concat_object = pd.concat(objects, join=join)
+        elif isinstance(objects[0], ad.AnnData):
+            concat_object = ad.concat(
+                objects, join=join, label="file_uid", keys=file_uids
+            )
+    return concat_object
 
 
 # docstring handled through attach_func_to_class_method
@@ -383,16 +523,9 @@ def load(
             raise RuntimeError(
                 "Can only load datasets where all files have the same suffix"
             )
-        # because we're tracking data flow on the dataset-level, here, we don't
-        # want to track it on the file-level
-        objects = [file.load(is_run_input=False) for file in all_files]
-        file_uids = [file.uid for file in all_files]
-        if isinstance(objects[0], pd.DataFrame):
-            concat_object = pd.concat(objects, join=join)
-        elif isinstance(objects[0], ad.AnnData):
-            concat_object = ad.concat(
-                objects, join=join, label="file_uid", keys=file_uids
-            )
+        # the staged files mustn't be evicted from the cache before they're loaded
+        with pin_files(all_files):
+            concat_object = _load_files(all_files, suffixes[0], join, **kwargs)
         # only call it here because there might be errors during concat
         _track_run_input(self, is_run_input)
         return concat_object
@@ -484,5 +617,7 @@ for name in METHOD_NAMES:
     attach_func_to_class_method(name, Dataset, globals())
 
 setattr(Dataset, "path", path)
+setattr(Dataset, "stage", stage)
+setattr(Dataset, "scan", scan)
 # this seems a Django-generated function
 delattr(Dataset, "get_visibility_display")
@@ -1,18 +1,37 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path, PurePath, PurePosixPath
-from typing import Any, List, Optional, Tuple, Union
+from threading import Lock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import anndata as ad
 import fsspec
 import lamindb_setup
 import pandas as pd
 from anndata import AnnData
+from django.db.models import Q
 from lamin_utils import colors, logger
 from lamindb_setup import settings as setup_settings
 from lamindb_setup._init_instance import register_storage
 from lamindb_setup.dev import StorageSettings
 from lamindb_setup.dev._docs import doc_args
 from lamindb_setup.dev._hub_utils import get_storage_region
-from lamindb_setup.dev.upath import create_path, extract_suffix_from_path
+from lamindb_setup.dev.upath import (
+    create_path,
+    extract_suffix_from_path,
+    print_hook,
+)
 from lnschema_core import Feature, FeatureSet, File, Run, Storage
 from lnschema_core.models import IsTree
 from lnschema_core.types import (
@@ -26,7 +45,13 @@ from lnschema_core.types import (
 from lamindb._utils import attach_func_to_class_method
 from lamindb.dev._data import _track_run_input
 from lamindb.dev._settings import settings
-from lamindb.dev.hashing import b16_to_b64, hash_file
+from lamindb.dev.hashing import (
+    b16_to_b64,
+    hash_dir,
+    hash_file,
+    hash_files,
+    matches_etag_hash,
+)
 from lamindb.dev.storage import (
     LocalPathClasses,
     UPath,
@@ -36,7 +61,17 @@ from lamindb.dev.storage import (
     size_adata,
     write_to_file,
 )
+from lamindb.dev.storage._arrow import is_pushdown
+from lamindb.dev.storage._arrow import iter_batches as iter_batches_from_path
 from lamindb.dev.storage._backed_access import AnnDataAccessor, BackedAccessor
+from lamindb.dev.storage._cache import (
+    cloud_to_local,
+    get_cache_manager,
+    is_synced,
+    is_valid_cache,
+    pinned,
+    sync_to_cache,
+)
 from lamindb.dev.storage.file import (
     auto_storage_key_from_file,
     auto_storage_key_from_id_suffix,
@@ -46,6 +81,7 @@ from lamindb.dev.versioning import get_ids_from_old_version, init_uid
 
 from . import _TESTING
 from ._feature import convert_numpy_dtype_to_lamin_feature_type
+from ._storage import storage_root_index
 from .dev._data import (
     add_transform_to_kwargs,
     get_run,
@@ -54,6 +90,9 @@ from .dev._data import (
 )
 from .dev.storage.file import AUTO_KEY_PREFIX
 
+if TYPE_CHECKING:
+    from lamindb._save import UploadFuture
+
 
 def process_pathlike(
     filepath: UPath, skip_existence_check: bool = False
@@ -109,8 +148,10 @@ def process_data(
     format: Optional[str],
     key: Optional[str],
     skip_existence_check: bool = False,
-) -> Tuple[Any, Union[Path, UPath], str, Storage, bool]:
+) -> Tuple[Any, Union[Path, UPath], str, Storage, bool, Optional[Tuple[str, str]]]:
     """Serialize a data object that's provided as file or in memory."""
+    # hash & type if they were computed while serializing
+    hash_and_type = None
     # if not overwritten, data gets stored in default storage
     if isinstance(data, (str, Path, UPath)):  # PathLike, spelled out
         filepath = create_path(data)
@@ -141,14 +182,37 @@ def process_data(
         if filepath.suffixes == []:
             filepath = filepath.with_suffix(suffix)
         if suffix not in {".zarr", ".zrad"}:
-            write_to_file(data, filepath)
+            hash_and_type = write_to_file(data, filepath)
         use_existing_storage_key = False
     else:
         raise NotImplementedError(
             f"Do not know how to create a file object from {data}, pass a filepath"
             " instead!"
         )
-    return memory_rep, filepath, suffix, storage, use_existing_storage_key
+    return (
+        memory_rep,
+        filepath,
+        suffix,
+        storage,
+        use_existing_storage_key,
+        hash_and_type,
+    )
+
+
+def hash_from_stat(stat: Optional[Dict]) -> Optional[Tuple[str, str]]:
+    """The hash of a cloud file from the ETag in its stat or listing info."""
+    if stat is None or "ETag" not in stat:
+        return None
+    # small files
+    if "-" not in stat["ETag"]:
+        # only store hash for non-multipart uploads
+        # we can't rapidly validate multi-part uploaded files client-side
+        # we can add more logic later down-the-road
+        return b16_to_b64(stat["ETag"]), "md5"
+    stripped_etag, suffix = stat["ETag"].split("-")
+    suffix = suffix.strip('"')
+    # this is the S3 chunk-hashing strategy
+    return f"{b16_to_b64(stripped_etag)}-{suffix}", "md5-n"
 
 
 def get_hash(
@@ -156,33 +220,29 @@ def get_hash(
     suffix,
     filepath_stat=None,
     check_hash: bool = True,
+    hash_and_type: Optional[Tuple[str, str]] = None,
+    existing_files: Optional[Dict[str, List[File]]] = None,
 ) -> Union[Tuple[Optional[str], Optional[str]], File]:
-    if suffix in {".zarr", ".zrad"}:
+    if suffix in {".zarr", ".zrad"} and hash_and_type is None:
         return None
-    if not isinstance(filepath, LocalPathClasses):
-        stat = filepath_stat
-        if stat is not None and "ETag" in stat:
-            # small files
-            if "-" not in stat["ETag"]:
-                # only store hash for non-multipart uploads
-                # we can't rapidly validate multi-part uploaded files client-side
-                # we can add more logic later down-the-road
-                hash = b16_to_b64(stat["ETag"])
-                hash_type = "md5"
-            else:
-                stripped_etag, suffix = stat["ETag"].split("-")
-                suffix = suffix.strip('"')
-                hash = f"{b16_to_b64(stripped_etag)}-{suffix}"
-                hash_type = "md5-n"  # this is the S3 chunk-hashing strategy
-        else:
+    if hash_and_type is not None:
+        # the hash was computed upfront, e.g., in parallel for many files
+        hash, hash_type = hash_and_type
+    elif not isinstance(filepath, LocalPathClasses):
+        hash_and_type = hash_from_stat(filepath_stat)
+        if hash_and_type is None:
             logger.warning(f"did not add hash for {filepath}")
             return None, None
+        hash, hash_type = hash_and_type
     else:
         hash, hash_type = hash_file(filepath)
     if not check_hash:
         return hash, hash_type
-    # also checks hidden and trashed files
-    result = File.filter(hash=hash, visibility=None).list()
+    if existing_files is not None and hash in existing_files:
+        # the hash was looked up upfront, e.g., in bulk for many files
+        result = existing_files[hash]
+    else:
+        result = get_existing_file(filepath, filepath_stat, hash, hash_type)
     if len(result) > 0:
         if settings.upon_file_create_if_hash_exists == "error":
             msg = f"file with same hash exists: {result[0]}"
@@ -213,30 +273,122 @@ def get_hash(
         return hash, hash_type
 
 
+def get_existing_file(
+    filepath: Union[Path, UPath], filepath_stat, hash: str, hash_type: str
+) -> List[File]:
+    """Look up the files with the same hash as a single file in one query.
+
+    Like in :func:`get_existing_files`, records with hashes from ETags are
+    compared with local files, but only if they have the same size.
+    """
+    query = Q(hash=hash)
+    compare_etags = isinstance(filepath, LocalPathClasses) and hash_type in {
+        "md5",
+        "sha1-fl",
+    }
+    if compare_etags:
+        size = (filepath_stat or filepath.stat()).st_size
+        query |= Q(size=size, hash_type__in=["md5", "md5-n"])
+    # also checks hidden and trashed files
+    files = File.filter(visibility=None).filter(query).list()
+    result = [file for file in files if file.hash == hash]
+    if len(result) == 0 and compare_etags:
+        computed: Dict = {}
+        result = [
+            file
+            for file in files
+            if file.hash_type != hash_type
+            and matches_etag_hash(
+                filepath, file.hash, file.hash_type, computed=computed
+            )
+        ]
+    return result
+
+
+def get_existing_files(
+    filepaths: List[Union[Path, UPath]],
+    hashes_and_types: List[Optional[Tuple[str, str]]],
+    batch_size: int = 500,
+) -> Dict[str, List[File]]:
+    """Look up the files with the same hashes as many files in few queries.
+
+    Both hashes and sizes are queried in batches to stay below the limit of
+    query parameters of the database.
+    """
+    hashes = list(
+        {
+            hash_and_type[0]
+            for hash_and_type in hashes_and_types
+            if hash_and_type is not None
+        }
+    )
+    existing_files: Dict[str, List[File]] = {hash: [] for hash in hashes}
+    for i in range(0, len(hashes), batch_size):
+        # also checks hidden and trashed files
+        batch = File.filter(hash__in=hashes[i : i + batch_size], visibility=None)
+        for file in batch:
+            existing_files[file.hash].append(file)
+    # local files might have been uploaded to the cloud, their records have
+    # hashes from ETags, which differ from the local hash if they were uploaded
+    # multipart or are larger than the hash chunk size
+    paths_by_size: Dict[int, List[Tuple[Union[Path, UPath], str, str]]] = {}
+    for filepath, hash_and_type in zip(filepaths, hashes_and_types):
+        if hash_and_type is None or len(existing_files[hash_and_type[0]]) > 0:
+            continue
+        hash, hash_type = hash_and_type
+        if isinstance(filepath, LocalPathClasses) and hash_type in {"md5", "sha1-fl"}:
+            size = filepath.stat().st_size
+            paths_by_size.setdefault(size, []).append((filepath, hash, hash_type))
+    # each local file is hashed at most once per part size, not per candidate
+    computed: Dict[Union[Path, UPath], Dict] = defaultdict(dict)
+    sizes = list(paths_by_size)
+    for i in range(0, len(sizes), batch_size):
+        candidates = File.filter(
+            size__in=sizes[i : i + batch_size],
+            hash_type__in=["md5", "md5-n"],
+            visibility=None,
+        )
+        for file in candidates:
+            for filepath, hash, hash_type in paths_by_size[file.size]:
+                if file.hash_type != hash_type and matches_etag_hash(
+                    filepath, file.hash, file.hash_type, computed=computed[filepath]
+                ):
+                    existing_files[hash].append(file)
+    return existing_files
+
+
 def get_path_size_hash(
     filepath: UPath,
     memory_rep: Optional[Union[pd.DataFrame, AnnData]],
     suffix: str,
     check_hash: bool = True,
+    precomputed_hash_and_type: Optional[Tuple[str, str]] = None,
+    existing_files: Optional[Dict[str, List[File]]] = None,
 ):
     cloudpath = None
     localpath = None
     hash_and_type: Tuple[Optional[str], Optional[str]]
 
     if suffix in {".zarr", ".zrad"}:
+        hash_and_type = None, None
         if memory_rep is not None:
             size = size_adata(memory_rep)
         else:
             if not isinstance(filepath, LocalPathClasses):
                 cloudpath = filepath
-                # todo: properly calculate size
-                size = 0
             else:
                 localpath = filepath
-                size = sum(
-                    f.stat().st_size for f in filepath.rglob("*") if f.is_file()  # type: ignore # noqa
-                )
-        hash_and_type = None, None
+            if settings.upon_file_create_skip_size_hash:
+                size = None
+            else:
+                hash, hash_type, size = hash_dir(filepath)
+                if hash is not None:
+                    hash_and_type = get_hash(
+                        filepath,
+                        suffix,
+                        check_hash=check_hash,
+                        hash_and_type=(hash, hash_type),
+                    )
     else:
         # to accelerate ingesting high numbers of files
         if settings.upon_file_create_skip_size_hash:
@@ -252,7 +404,12 @@ def get_path_size_hash(
                 size = filepath_stat.st_size  # type: ignore
                 localpath = filepath
             hash_and_type = get_hash(
-                filepath, suffix, filepath_stat=filepath_stat, check_hash=check_hash
+                filepath,
+                suffix,
+                filepath_stat=filepath_stat,
+                check_hash=check_hash,
+                hash_and_type=precomputed_hash_and_type,
+                existing_files=existing_files,
             )
     return localpath, cloudpath, size, hash_and_type
 
@@ -260,11 +417,9 @@ def get_path_size_hash(
 def check_path_in_existing_storage(
     filepath: Union[Path, UPath]
 ) -> Union[Storage, bool]:
-    for storage in Storage.filter().all():
-        # if path is part of storage, return it
-        if check_path_is_child_of_root(filepath, root=create_path(storage.root)):
-            return storage
-    return False
+    # if path is part of storage, return it
+    storage = storage_root_index.lookup(filepath)
+    return storage if storage is not None else False
 
 
 def check_path_is_child_of_root(
@@ -318,17 +473,28 @@ def get_file_kwargs_from_data(
     format: Optional[str],
     provisional_uid: str,
     skip_check_exists: bool = False,
+    hash_and_type: Optional[Tuple[str, str]] = None,
+    existing_files: Optional[Dict[str, List[File]]] = None,
 ):
     run = get_run(run)
-    memory_rep, filepath, suffix, storage, use_existing_storage_key = process_data(
-        provisional_uid, data, format, key, skip_check_exists
-    )
+    (
+        memory_rep,
+        filepath,
+        suffix,
+        storage,
+        use_existing_storage_key,
+        written_hash_and_type,
+    ) = process_data(provisional_uid, data, format, key, skip_check_exists)
+    if hash_and_type is None:
+        hash_and_type = written_hash_and_type
     # the following will return a localpath that is not None if filepath is local
     # it will return a cloudpath that is not None if filepath is on the cloud
     local_filepath, cloud_filepath, size, hash_and_type = get_path_size_hash(
         filepath,
         memory_rep,
         suffix,
+        precomputed_hash_and_type=hash_and_type,
+        existing_files=existing_files,
     )
     if isinstance(hash_and_type, File):
         return hash_and_type, None
@@ -485,6 +651,10 @@ def __init__(file: File, *args, **kwargs):
     skip_check_exists = (
         kwargs.pop("skip_check_exists") if "skip_check_exists" in kwargs else False
     )
+    hash_and_type = kwargs.pop("hash_and_type") if "hash_and_type" in kwargs else None
+    existing_files = (
+        kwargs.pop("existing_files") if "existing_files" in kwargs else None
+    )
 
     if not len(kwargs) == 0:
         raise ValueError(
@@ -516,6 +686,8 @@ def __init__(file: File, *args, **kwargs):
         format=format,
         provisional_uid=provisional_uid,
         skip_check_exists=skip_check_exists,
+        hash_and_type=hash_and_type,
+        existing_files=existing_files,
     )
 
     # an object with the same hash already exists
@@ -672,6 +844,43 @@ def from_anndata(
     return file
 
 
+def hash_filepaths(
+    filepaths: List[Union[Path, UPath]], stats: Optional[List[Optional[Dict]]] = None
+) -> List[Optional[Tuple[str, str]]]:
+    """Hash many files upfront, so that duplicates can be looked up in bulk.
+
+    Local files are hashed in parallel. The hashes of cloud files are taken
+    from the ETags of their `stats`, e.g., from a listing, if not passed, the
+    files are stat-ed in parallel.
+    """
+    if settings.upon_file_create_skip_size_hash:
+        return [None] * len(filepaths)
+    is_local = [isinstance(filepath, LocalPathClasses) for filepath in filepaths]
+    indices = [
+        i
+        for i, filepath in enumerate(filepaths)
+        if filepath.suffix not in {".zarr", ".zrad"}
+    ]
+    local_indices = [i for i in indices if is_local[i]]
+    hashes: List[Optional[Tuple[str, str]]] = [None] * len(filepaths)
+    for i, hash_and_type in zip(
+        local_indices, hash_files([filepaths[i] for i in local_indices])
+    ):
+        hashes[i] = hash_and_type
+    stats = [None] * len(filepaths) if stats is None else list(stats)
+    cloud_indices = [i for i in indices if not is_local[i]]
+    missing_indices = [i for i in cloud_indices if stats[i] is None]
+    with ThreadPoolExecutor() as executor:
+        missing_stats = list(
+            executor.map(lambda i: filepaths[i].stat(), missing_indices)
+        )
+    for i, stat in zip(missing_indices, missing_stats):
+        stats[i] = stat
+    for i in cloud_indices:
+        hashes[i] = hash_from_stat(stats[i])
+    return hashes
+
+
 @classmethod  # type: ignore
 @doc_args(File.from_dir.__doc__)
 def from_dir(
@@ -711,14 +920,33 @@ def from_dir(
     verbosity_int = settings._verbosity_int
     if verbosity_int >= 1:
         settings.verbosity = "warning"
+    filepaths = [
+        filepath for filepath in folderpath.rglob(pattern) if filepath.is_file()
+    ]
+    stats = None
+    if not isinstance(folderpath, LocalPathClasses):
+        # the ETags of cloud files are taken from a single listing
+        fs = folderpath.fs
+        infos = fs.find(fs._strip_protocol(folderpath.as_posix()), detail=True)
+        stats = [
+            infos.get(fs._strip_protocol(filepath.as_posix())) for filepath in filepaths
+        ]
+    hashes_and_types = hash_filepaths(filepaths, stats)
+    existing_files = get_existing_files(filepaths, hashes_and_types)
     files_dict = {}
-    for filepath in folderpath.rglob(pattern):
-        if filepath.is_file():
-            relative_path = get_relative_path_to_directory(filepath, folderpath)
-            file_key = folder_key + "/" + relative_path.as_posix()
-            # if creating from rglob, we don't need to check for existence
-            file = File(filepath, run=run, key=file_key, skip_check_exists=True)
-            files_dict[file.uid] = file
+    for filepath, hash_and_type in zip(filepaths, hashes_and_types):
+        relative_path = get_relative_path_to_directory(filepath, folderpath)
+        file_key = folder_key + "/" + relative_path.as_posix()
+        # if creating from rglob, we don't need to check for existence
+        file = File(
+            filepath,
+            run=run,
+            key=file_key,
+            skip_check_exists=True,
+            hash_and_type=hash_and_type,
+            existing_files=existing_files,
+        )
+        files_dict[file.uid] = file
     settings.verbosity = verbosity
 
     # run sanity check on hashes
@@ -758,6 +986,54 @@ def from_dir(
     return files
 
 
+@classmethod  # type: ignore
+def from_paths(
+    cls,
+    paths: Iterable[PathLike],
+    keys: Optional[List[str]] = None,
+    *,
+    description: Optional[str] = None,
+    run: Optional[Run] = None,
+) -> List["File"]:
+    """Create a list of file objects from many paths.
+
+    Local files are hashed in parallel, the hashes of cloud files are taken
+    from their ETags, and existing files with the same hashes are looked up in
+    bulk, which is much faster than creating file objects one
+    by one.
+
+    Args:
+        paths: Local or cloud paths.
+        keys: A key for each path, if any.
+        description: A description shared by all files.
+        run: The run that creates the files.
+
+    Examples:
+
+        >>> files = ln.File.from_paths(["./data/1.fastq.gz", "./data/2.fastq.gz"], description="fastqs")  # noqa
+        >>> ln.save(files)
+    """
+    filepaths = [create_path(path) for path in paths]
+    if keys is None:
+        keys = [None] * len(filepaths)  # type: ignore
+    elif len(keys) != len(filepaths):
+        raise ValueError("Pass as many keys as paths")
+    hashes_and_types = hash_filepaths(filepaths)
+    existing_files = get_existing_files(filepaths, hashes_and_types)
+    files = [
+        File(
+            filepath,
+            key=key,
+            description=description,
+            run=run,
+            hash_and_type=hash_and_type,
+            existing_files=existing_files,
+        )
+        for filepath, key, hash_and_type in zip(filepaths, keys, hashes_and_types)
+    ]
+    return files
+
+
 # docstring handled through attach_func_to_class_method
 def replace(
     self,
@@ -834,12 +1110,32 @@ def backed(
     filepath = filepath_from_file(self)
     # consider the case where an object is already locally cached
     localpath = setup_settings.instance.storage.cloud_to_local_no_update(filepath)
-    if localpath.exists():
-        return backed_access(localpath)
+    cache_manager = get_cache_manager()
+    # files with a hash need to be validated, without, the cache is trusted
+    if self.hash is not None and cache_manager is not None:
+        is_cached = is_valid_cache(filepath, localpath, self)
+    else:
+        is_cached = localpath.exists()
+    if is_cached:
+        accessor = backed_access(localpath)
+        if cache_manager is not None and isinstance(accessor, AnnDataAccessor):
+            cache_manager.record_access(localpath)
+            # don't evict the file while it's accessed
+            cache_manager.pin(localpath)
+            accessor._pinned_path = localpath
+        return accessor
     else:
         return backed_access(filepath)
 
 
+def _valid_cache_path_or_storage_path(
+    file: File, filepath: Union[Path, UPath]
+) -> Union[Path, UPath]:
+    if not is_synced(filepath, file):
+        return filepath
+    return setup_settings.instance.storage.cloud_to_local_no_update(filepath)
+
+
 # docstring handled through attach_func_to_class_method
 def load(
     self, is_run_input: Optional[bool] = None, stream: bool = False, **kwargs
@@ -847,7 +1143,42 @@ def load(
     _track_run_input(self, is_run_input)
     if hasattr(self, "_memory_rep") and self._memory_rep is not None:
         return self._memory_rep
-    return load_to_memory(filepath_from_file(self), stream=stream, **kwargs)
+    filepath = filepath_from_file(self)
+    if self.suffix == ".parquet" and is_pushdown(kwargs):
+        # read the selection from storage unless the cached file is valid
+        filepath = _valid_cache_path_or_storage_path(self, filepath)
+    elif self.suffix not in {".zarr", ".zrad"} and not (
+        stream and self.suffix == ".h5ad"
+    ):
+        # the cached file is validated against the hash of the record
+        filepath = cloud_to_local(filepath, file=self, print_progress=True)
+    return load_to_memory(filepath, stream=stream, **kwargs)
+
+
+def iter_batches(
+    self,
+    batch_size: int = 100000,
+    columns: Optional[List[str]] = None,
+    is_run_input: Optional[bool] = None,
+) -> Iterator[pd.DataFrame]:
+    """Iterate over the rows of a csv, tsv or parquet file in batches.
+
+    The file is streamed from storage in bounded memory, a valid cached copy
+    is read instead if there is one.
+
+    Args:
+        batch_size: The maximal number of rows of a batch.
+        columns: The columns to read, all columns if `None`.
+        is_run_input: Whether to track this file as run input.
+
+    Examples:
+
+        >>> for df in file.iter_batches(batch_size=10000):
+        ...     process(df)
+    """
+    _track_run_input(self, is_run_input)
+    filepath = _valid_cache_path_or_storage_path(self, filepath_from_file(self))
+    return iter_batches_from_path(filepath, batch_size=batch_size, columns=columns)
 
 
 # docstring handled through attach_func_to_class_method
@@ -857,7 +1188,65 @@ def stage(self, is_run_input: Optional[bool] = None) -> Path:
     _track_run_input(self, is_run_input)
 
     filepath = filepath_from_file(self)
-    return setup_settings.instance.storage.cloud_to_local(filepath, print_progress=True)
+    return cloud_to_local(filepath, file=self, print_progress=True)
+
+
+@contextmanager
+def pin_files(files: Iterable[File]) -> Iterator[None]:
+    """Protect the cached copies of files from eviction within the context."""
+    localpaths = [
+        setup_settings.instance.storage.cloud_to_local_no_update(
+            filepath_from_file(file)
+        )
+        for file in files
+    ]
+    with pinned(localpaths):
+        yield None
+
+
+def stage_files(files: List[File], max_workers: Optional[int] = None) -> List[Path]:
+    """Stage many files concurrently with a shared progress bar.
+
+    Files that are up-to-date in the cache aren't downloaded again. Returns
+    the local paths in the order of the files.
+    """
+    for file in files:
+        if file.suffix in {".zrad", ".zarr"}:
+            raise RuntimeError(
+                "zarr object can't be staged, please use load() or stream()"
+            )
+    filepaths = [filepath_from_file(file) for file in files]
+    # progress is only reported for files that might need to be downloaded
+    to_sync = [
+        not is_synced(filepath, file) for file, filepath in zip(files, filepaths)
+    ]
+    n_to_sync = sum(to_sync)
+    n_synced = 0
+    any_downloaded = False
+    lock = Lock()
+
+    def stage_file(file: File, filepath: UPath, sync: bool) -> Path:
+        nonlocal n_synced, any_downloaded
+        # progress bars of concurrent downloads would garble each other
+        localpath, downloaded = sync_to_cache(
+            filepath, file=file, print_progress=n_to_sync == 1
+        )
+        if sync and n_to_sync > 1:
+            with lock:
+                n_synced += 1
+                any_downloaded = any_downloaded or downloaded
+                if any_downloaded:
+                    print_hook(
+                        size=n_to_sync,
+                        value=n_synced,
+                        filepath="files",
+                        action="staging",
+                    )
+        return localpath
+
+    # files staged early in the batch mustn't be evicted by later ones
+    with pin_files(files), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(stage_file, files, filepaths, to_sync))
 
 
 # docstring handled through attach_func_to_class_method
@@ -918,9 +1307,25 @@ def _delete_skip_storage(file, *args, **kwargs) -> None:
 
 
 # docstring handled through attach_func_to_class_method
-def save(self, *args, **kwargs) -> None:
+def save(self, *args, **kwargs) -> Optional["UploadFuture"]:
+    from lamindb._save import (
+        check_and_attempt_clearing,
+        check_and_attempt_upload,
+        get_pending_upload,
+        save_in_background,
+    )
+
+    background = kwargs.pop("background", False)
+    # never upload a file twice, return or wait for a pending upload
+    upload = get_pending_upload(self)
+    if upload is not None:
+        if background:
+            return upload
+        upload.wait()
+    # upload in the background & return a handle to wait on
+    if background:
+        return save_in_background(self, *args, **kwargs)
     self._save_skip_storage(*args, **kwargs)
-    from lamindb._save import check_and_attempt_clearing, check_and_attempt_upload
 
     exception = check_and_attempt_upload(self)
     if exception is not None:
@@ -1002,5 +1407,7 @@ for name in METHOD_NAMES:
 File._delete_skip_storage = _delete_skip_storage
 File._save_skip_storage = _save_skip_storage
 setattr(File, "path", path)
+setattr(File, "from_paths", from_paths)
+setattr(File, "iter_batches", iter_batches)
 # this seems a Django-generated function
 delattr(File, "get_visibility_display")
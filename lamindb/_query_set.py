@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Iterable, List, NamedTuple, Optional, Union
 
 import pandas as pd
@@ -234,6 +235,33 @@ class QuerySet(models.QuerySet, CanValidate, IsTree):
 
         return _standardize(cls=self, values=values, field=field, **kwargs)
 
+    def stage(
+        self, max_workers: Optional[int] = None, is_run_input: Optional[bool] = None
+    ) -> List[Path]:
+        """Download all files of a query to the cache.
+
+        Files are downloaded concurrently, files that are up-to-date in the
+        cache are skipped.
+
+        Args:
+            max_workers: The maximal number of concurrent downloads.
+            is_run_input: Whether to track the files as run inputs.
+
+        Examples:
+
+            >>> paths = ln.File.filter(suffix=".h5ad").stage()
+        """
+        from lnschema_core.models import File
+
+        from ._file import stage_files
+        from .dev._data import _track_run_input
+
+        if self.model is not File:
+            raise TypeError("Can only stage a query of files")
+        files = self.list()
+        _track_run_input(files, is_run_input)
+        return stage_files(files, max_workers=max_workers)
+
     @doc_args(IsTree.view_tree.__doc__)
     def view_tree(
         self,
@@ -264,3 +292,4 @@ setattr(models.QuerySet, "lookup", QuerySet.lookup)
 setattr(models.QuerySet, "validate", QuerySet.validate)
 setattr(models.QuerySet, "inspect", QuerySet.inspect)
 setattr(models.QuerySet, "standardize", QuerySet.standardize)
+setattr(models.QuerySet, "stage", QuerySet.stage)
@@ -1,21 +1,27 @@
+import atexit
 import os
-import shutil
+import threading
 import traceback
 from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from functools import partial
 from typing import Iterable, List, Optional, Tuple, Union, overload  # noqa
 
 import lamindb_setup
-from django.db import transaction
+from django.db import connections, transaction
 from django.utils.functional import partition
 from lamin_utils import logger
 from lamindb_setup.dev.upath import print_hook
 from lnschema_core.models import File, Registry
+from lnschema_core.types import VisibilityChoice
 
+from lamindb.dev._settings import settings
 from lamindb.dev.storage import store_object
+from lamindb.dev.storage._cache import get_cache_manager
 from lamindb.dev.storage.file import (
     auto_storage_key_from_file,
+    clone_or_copy,
     delete_storage_using_key,
 )
 
@@ -129,12 +135,14 @@ def bulk_create(records: Iterable[Registry], ignore_conflicts: Optional[bool] =
 
 
 # This is also used within File.save()
-def check_and_attempt_upload(file: File) -> Optional[Exception]:
+def check_and_attempt_upload(
+    file: File, print_progress: bool = True
+) -> Optional[Exception]:
     # if File object is either newly instantiated or replace() was called on
     # a local env it will have a _local_filepath and needs to be uploaded
     if hasattr(file, "_local_filepath"):
         try:
-            upload_data_object(file)
+            upload_data_object(file, print_progress=print_progress)
         except Exception as exception:
             logger.warning(f"could not upload file: {file}")
             return exception
@@ -172,10 +180,18 @@ def copy_or_move_to_cache(file: File):
     if cache_dir in local_path.parents:
         local_path.replace(cache_path)
     else:
-        shutil.copy(local_path, cache_path)
-    # make sure that the cached version is older than the cloud one
-    mts = datetime.now().timestamp() + 1.0
-    os.utime(cache_path, times=(mts, mts))
+        clone_or_copy(local_path, cache_path)
+    cache_manager = get_cache_manager()
+    if cache_manager is not None and file.hash is not None:
+        # the cached version is fresh as long as it matches the hash
+        cache_manager.record_validation(cache_path, file)
+    else:
+        # make sure that the cached version is older than the cloud one, it's
+        # a copy or a clone, so this doesn't touch the source file
+        mts = datetime.now().timestamp() + 1.0
+        os.utime(cache_path, times=(mts, mts))
+    if cache_manager is not None:
+        cache_manager.record_access(cache_path)
 
 
 # This is also used within File.save()
@@ -196,39 +212,189 @@ def check_and_attempt_clearing(file: File) -> Optional[Exception]:
     return None
 
 
-def store_files(files: Iterable[File]) -> None:
+def store_files(files: Iterable[File], max_workers: Optional[int] = None) -> None:
     """Upload files in a list of database-committed files to storage.
 
-    If any upload fails, subsequent files are cleaned up from the DB.
+    Files are uploaded concurrently. If any upload fails, pending uploads are
+    cancelled and files that weren't stored are cleaned up from the DB.
     """
-    exception: Optional[Exception] = None
+    files = list(files)
+    if max_workers is None:
+        max_workers = settings.upload_max_workers
+    exceptions: List[Tuple[File, Exception]] = []
     # because uploads might fail, we need to maintain a new list
     # of the succeeded uploads
     stored_files = []
 
+    def store_file(file: File) -> Optional[Exception]:
+        try:
+            # progress bars of concurrent uploads would garble each other
+            exception = check_and_attempt_upload(file, print_progress=len(files) == 1)
+            if exception is not None:
+                return exception
+            stored_files.append(file)
+            exception = check_and_attempt_clearing(file)
+            if exception is not None:
+                logger.warning(f"clean up of {file._clear_storagekey} failed")
+            return exception
+        finally:
+            # close the connections that Django opened for this thread
+            connections.close_all()
+
     # upload new local files
-    for file in files:
-        exception = check_and_attempt_upload(file)
-        if exception is not None:
-            break
-        stored_files += [file]
-        exception = check_and_attempt_clearing(file)
-        if exception is not None:
-            logger.warning(f"clean up of {file._clear_storagekey} failed")
-            break
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(store_file, file): file for file in files}
+        for n_done, future in enumerate(as_completed(futures), start=1):
+            if future.cancelled():
+                continue
+            exception = future.result()
+            if exception is not None:
+                if len(exceptions) == 0:
+                    # don't start further uploads
+                    for pending in futures:
+                        pending.cancel()
+                exceptions.append((futures[future], exception))
+            elif len(files) > 1:
+                print_hook(
+                    size=len(files), value=n_done, filepath="files", action="storing"
+                )
 
-    if exception is not None:
+    if len(exceptions) > 0:
         # clean up metadata for files not uploaded to storage
         with transaction.atomic():
             for file in files:
                 if file not in stored_files:
                     file._delete_skip_storage()
-        error_message = prepare_error_message(files, stored_files, exception)
+        error_message = prepare_error_message(files, stored_files, exceptions)
         raise RuntimeError(error_message)
     return None
 
 
-def prepare_error_message(records, stored_files, exception) -> str:
+class UploadFuture:
+    """Handle of a file upload in the background.
+
+    Returned by `file.save(background=True)`, which commits the record and
+    returns before the upload completes. Until then, the file is hidden.
+    Saving the file again during the upload returns the same handle, or with
+    `background=False`, waits for it.
+
+    Examples:
+
+        >>> upload = file.save(background=True)
+        >>> # continue computing
+        >>> upload.wait()
+    """
+
+    def __init__(self, file: File, future: Future):
+        self.file = file
+        self._future = future
+        self._waited = False
+
+    def done(self) -> bool:
+        """Whether the upload finished, successfully or not."""
+        return self._future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for the upload to finish.
+
+        Raises a `RuntimeError` if the upload failed, in this case, the record
+        was deleted from the database.
+        """
+        try:
+            self._future.result(timeout=timeout)
+        finally:
+            # the outcome was reported to the caller
+            self._waited = self._future.done()
+
+
+_upload_executor: Optional[ThreadPoolExecutor] = None
+_pending_uploads: List[UploadFuture] = []
+_uploads_lock = threading.Lock()
+
+
+def _delete_hidden_record(file: File, file_id: int) -> None:
+    # the hidden record of a failed upload mustn't stay in the database
+    try:
+        file._delete_skip_storage()
+    except Exception:
+        # e.g., the connection of the upload thread broke, retry with a new one
+        connections.close_all()
+        File.objects.filter(id=file_id).delete()
+
+
+def _finish_background_upload(file: File, visibility: int) -> None:
+    file_id = file.id
+    try:
+        try:
+            exception = check_and_attempt_upload(file, print_progress=False)
+        except Exception as e:  # e.g., copying to the cache failed
+            exception = e
+        if exception is not None:
+            _delete_hidden_record(file, file_id)
+            raise RuntimeError(exception)
+        # only update visibility to not overwrite concurrent changes
+        File.objects.filter(id=file_id).update(visibility=visibility)
+        file.visibility = visibility
+        # the file is stored, so stale objects are cleared once it's visible
+        exception = check_and_attempt_clearing(file)
+        if exception is not None:
+            raise RuntimeError(exception)
+    finally:
+        connections.close_all()
+
+
+def get_pending_upload(file: File) -> Optional[UploadFuture]:
+    """The background upload of a file that didn't finish yet, if any."""
+    with _uploads_lock:
+        for upload in _pending_uploads:
+            if upload.file is file and not upload.done():
+                return upload
+    return None
+
+
+def save_in_background(file: File, *args, **kwargs) -> UploadFuture:
+    """Commit a file to the database and upload it in the background."""
+    global _upload_executor
+
+    visibility = file.visibility
+    file.visibility = VisibilityChoice.hidden.value
+    file._save_skip_storage(*args, **kwargs)
+    with _uploads_lock:
+        if _upload_executor is None:
+            _upload_executor = ThreadPoolExecutor(
+                max_workers=settings.upload_max_workers,
+                thread_name_prefix="lamindb-upload",
+            )
+        future = _upload_executor.submit(_finish_background_upload, file, visibility)
+        upload = UploadFuture(file, future)
+        _pending_uploads.append(upload)
+    return upload
+
+
+def wait_for_uploads() -> None:
+    """Wait for all uploads started with `file.save(background=True)`.
+
+    Called at interpreter exit. Failed uploads are reported but don't raise.
+    """
+    with _uploads_lock:
+        uploads = list(_pending_uploads)
+        _pending_uploads.clear()
+    n_pending = sum(not upload.done() for upload in uploads)
+    if n_pending > 0:
+        logger.info(f"waiting for {n_pending} background uploads")
+    for upload in uploads:
+        if upload._waited:
+            continue
+        try:
+            upload.wait()
+        except Exception as exception:
+            logger.error(f"could not upload file {upload.file.uid}: {exception}")
+
+
+atexit.register(wait_for_uploads)
+
+
+def prepare_error_message(records, stored_files, exceptions) -> str:
     if len(records) == 1 or len(stored_files) == 0:
         error_message = (
             "No entries were uploaded or committed"
@@ -244,11 +410,17 @@ def prepare_error_message(records, stored_files, exception) -> str:
                 f"- {', '.join(record.__repr__().split(', ')[:3]) + ', ...)'}\n"
             )
         error_message += "\nSee error message:\n\n"
-    error_message += f"{str(exception)}\n\n{traceback.format_exc()}"
+    for record, exception in exceptions:
+        trace = "".join(
+            traceback.format_exception(
+                type(exception), exception, exception.__traceback__
+            )
+        )
+        error_message += f"{record.uid}: {str(exception)}\n\n{trace}\n"
     return error_message
 
 
-def upload_data_object(file) -> None:
+def upload_data_object(file, print_progress: bool = True) -> None:
     """Store and add file and its linked entries."""
     # do NOT hand-craft the storage key!
     file_storage_key = auto_storage_key_from_file(file)
@@ -262,10 +434,14 @@ def upload_data_object(file) -> None:
         and file._memory_rep is not None
     ):
         logger.save(msg)
-        print_progress = partial(
-            print_hook, filepath=file_storage_key, action="uploading"
+        callback = (
+            partial(print_hook, filepath=file_storage_key, action="uploading")
+            if print_progress
+            else None
         )
-        write_adata_zarr(file._memory_rep, storage_path, callback=print_progress)
+        write_adata_zarr(file._memory_rep, storage_path, callback=callback)
     elif hasattr(file, "_to_store") and file._to_store:
         logger.save(msg)
-        store_object(file._local_filepath, file_storage_key)
+        store_object(
+            file._local_filepath, file_storage_key, print_progress=print_progress
+        )
@@ -1,5 +1,9 @@
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from django.db.models.signals import post_delete, post_save
 from lamindb_setup.dev._docs import doc_args
-from lamindb_setup.dev.upath import UPath, create_path
+from lamindb_setup.dev.upath import LocalPathClasses, UPath, create_path
 from lnschema_core import Storage
 
 
@@ -14,5 +18,54 @@ def path(self) -> UPath:
     return create_path(self.root)
 
 
+def path_parts(path: Union[Path, UPath]) -> Tuple[str, ...]:
+    if not isinstance(path, UPath) or isinstance(path, LocalPathClasses):
+        return ("file",) + Path(path).resolve().parts
+    protocol, _, rest = path.as_posix().partition("://")
+    return (protocol,) + tuple(part for part in rest.split("/") if part)
+
+
+class StorageRootIndex:
+    """Prefix trie of the roots of all storage locations.
+
+    Resolves the storage location of a path in O(path depth) without querying
+    the database. It's rebuilt after a storage location was saved or deleted.
+    """
+
+    def __init__(self):
+        self._trie: Optional[Dict[Optional[str], Any]] = None
+
+    def clear(self, **kwargs) -> None:
+        self._trie = None
+
+    def _build(self) -> Dict[Optional[str], Any]:
+        trie: Dict[Optional[str], Any] = {}
+        for storage in Storage.filter().all():
+            node = trie
+            for part in path_parts(create_path(storage.root)):
+                node = node.setdefault(part, {})
+            # parts are strings, None marks a storage root
+            node[None] = storage
+        return trie
+
+    def lookup(self, filepath: Union[Path, UPath]) -> Optional[Storage]:
+        """The storage location with the deepest root that contains the path."""
+        if self._trie is None:
+            self._trie = self._build()
+        node = self._trie
+        storage = None
+        # a root has to be a parent of the path
+        for part in path_parts(filepath)[:-1]:
+            node = node.get(part)
+            if node is None:
+                break
+            storage = node.get(None, storage)
+        return storage
+
+
+storage_root_index = StorageRootIndex()
+post_save.connect(storage_root_index.clear, sender=Storage, weak=False)
+post_delete.connect(storage_root_index.clear, sender=Storage, weak=False)
+
 setattr(Storage, "root_as_path", root_as_path)
 setattr(Storage, "path", path)
@@ -45,6 +45,9 @@ Auxiliary tools:
    storage
    fields
    Settings
+   ZarrWritePolicy
+   UploadFuture
+   wait_for_uploads
    types
    exceptions
    MappedDataset
@@ -55,10 +58,11 @@ from lnschema_core.models import CanValidate, Data, HasParents, IsTree, Registry
 
 from lamindb._query_manager import QueryManager
 from lamindb._query_set import QuerySet
+from lamindb._save import UploadFuture, wait_for_uploads
 from lamindb.dev._feature_manager import FeatureManager
 from lamindb.dev._label_manager import LabelManager
 
 from . import _data, datasets, exceptions, fields, types  # noqa
 from ._mapped_dataset import MappedDataset
 from ._run_context import run_context
-from ._settings import Settings
+from ._settings import Settings, ZarrWritePolicy
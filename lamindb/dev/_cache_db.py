@@ -0,0 +1,58 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict
+
+# the tables of the hash cache and of the manager of cached cloud files
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS hashes (path TEXT, chunk_size INTEGER, size INTEGER,"
+    " mtime_ns INTEGER, inode INTEGER, hash TEXT, hash_type TEXT,"
+    " PRIMARY KEY (path, chunk_size))",
+    "CREATE TABLE IF NOT EXISTS entries (path TEXT PRIMARY KEY, size INTEGER,"
+    " last_access REAL)",
+    "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)",
+    "CREATE TABLE IF NOT EXISTS pins (path TEXT, pid INTEGER)",
+    "CREATE TABLE IF NOT EXISTS validations (path TEXT PRIMARY KEY, hash TEXT,"
+    " hash_type TEXT, size INTEGER, mtime_ns INTEGER)",
+]
+
+
+class CacheDatabase:
+    """The sqlite database of lamindb in the cache directory.
+
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        # sqlite connections can't be shared across threads
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # under WAL, commits don't wait for fsync, the cache stays consistent
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+
+_DATABASES: Dict[Path, CacheDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_cache_database(db_path: Path) -> CacheDatabase:
+    """The database at `db_path`, shared by all users in this process."""
+    with _databases_lock:
+        if db_path not in _DATABASES:
+            _DATABASES[db_path] = CacheDatabase(db_path)
+        return _DATABASES[db_path]
+
+
+def cache_db_path(cache_dir: Path) -> Path:
+    return Path(cache_dir) / ".lamindb" / "cache.sqlite"
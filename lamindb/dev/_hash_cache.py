@@ -0,0 +1,134 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import lamindb_setup
+
+from lamindb.dev._cache_db import cache_db_path, get_cache_database
+from lamindb.dev._settings import settings
+
+# files modified within this window might still be written to and have a
+# coarse-grained mtime, their hashes aren't cached (git calls this "racy")
+RACY_WINDOW_NS = 2 * 10**9
+# new entries are written in batches, one transaction per file would fsync for
+# every hash and throttle parallel hashing
+FLUSH_SIZE = 1000
+
+
+class HashCache:
+    """On-disk cache of file hashes keyed by (path, size, mtime_ns, inode).
+
+    An entry is only returned if size, mtime and inode of the file still match,
+    otherwise the hash is recomputed and the entry is replaced. New entries are
+    kept in memory until :meth:`flush` writes them in one transaction.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._db = get_cache_database(db_path)
+        self._pending: Dict[Tuple[str, int], Tuple] = {}
+        self._pending_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def get(
+        self, path: str, stat: os.stat_result, chunk_size: Optional[int]
+    ) -> Optional[Tuple[str, str]]:
+        key = (path, -1 if chunk_size is None else chunk_size)
+        with self._pending_lock:
+            row = self._pending.get(key)
+        if row is None:
+            row = (
+                self._connection()
+                .execute("SELECT * FROM hashes WHERE path = ? AND chunk_size = ?", key)
+                .fetchone()
+            )
+        if row is None or tuple(row[2:5]) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+            stat.st_ino,
+        ):
+            return None
+        return row[5], row[6]
+
+    def set(
+        self,
+        path: str,
+        stat: os.stat_result,
+        chunk_size: Optional[int],
+        hash_and_type: Tuple[str, str],
+    ) -> None:
+        if time.time_ns() - stat.st_mtime_ns < RACY_WINDOW_NS:
+            return None
+        key = (path, -1 if chunk_size is None else chunk_size)
+        row = (*key, stat.st_size, stat.st_mtime_ns, stat.st_ino, *hash_and_type)
+        with self._pending_lock:
+            self._pending[key] = row
+            if len(self._pending) < FLUSH_SIZE:
+                return None
+        self.flush()
+
+    def flush(self) -> None:
+        """Write the new entries to disk."""
+        with self._pending_lock:
+            rows = list(self._pending.values())
+            self._pending.clear()
+        if len(rows) == 0:
+            return None
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def prune(self) -> int:
+        """Remove entries of files that were deleted or modified.
+
+        Returns the number of removed entries.
+        """
+        self.flush()
+        conn = self._connection()
+        rows = conn.execute("SELECT path, size, mtime_ns, inode FROM hashes")
+        stale = []
+        for path, size, mtime_ns, inode in rows.fetchall():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stale.append((path,))
+                continue
+            if (stat.st_size, stat.st_mtime_ns, stat.st_ino) != (size, mtime_ns, inode):
+                stale.append((path,))
+        with conn:
+            conn.executemany("DELETE FROM hashes WHERE path = ?", stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._pending_lock:
+            self._pending.clear()
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM hashes")
+
+
+_HASH_CACHES: Dict[Path, HashCache] = {}
+
+
+def get_hash_cache() -> Optional[HashCache]:
+    """The hash cache in the cache directory, `None` if it's switched off."""
+    if not settings.file_hash_cache:
+        return None
+    try:
+        cache_dir = lamindb_setup.settings.storage.cache_dir
+    except Exception:  # no instance is set up
+        return None
+    db_path = cache_db_path(cache_dir)
+    if db_path not in _HASH_CACHES:
+        _HASH_CACHES[db_path] = HashCache(db_path)
+        atexit.register(_HASH_CACHES[db_path].flush)
+    return _HASH_CACHES[db_path]
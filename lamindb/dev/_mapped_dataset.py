@@ -3,9 +3,16 @@ from os import PathLike
 from typing import List, Optional, Union
 
 import numpy as np
-from lamindb_setup.dev.upath import UPath
+from lamindb_setup.dev.upath import LocalPathClasses, UPath
 
-from .storage._backed_access import ArrayTypes, GroupTypes, StorageType, registry
+from .storage._backed_access import (
+    ArrayTypes,
+    GroupTypes,
+    StorageType,
+    _memmap_dense,
+    registry,
+)
+from .storage._cache import get_cache_manager
 
 
 class MappedDataset:
@@ -29,8 +36,14 @@ class MappedDataset:
     ):
         self.storages = []
         self.conns = []
+        # don't evict cached files while they're accessed
+        cache_manager = get_cache_manager()
+        self._pinned_paths = []
         for path in path_list:
             path = UPath(path)
+            if cache_manager is not None and isinstance(path, LocalPathClasses):
+                cache_manager.pin(path)
+                self._pinned_paths.append(path)
             if path.exists() and path.is_file():  # type: ignore
                 conn, storage = registry.open("h5py", path)
             else:
@@ -46,6 +59,8 @@ class MappedDataset:
             else:
                 self.n_obs_list.append(X.attrs["shape"][0])
         self.n_obs = sum(self.n_obs_list)
+        # zero-copy access for dense X in local uncompressed h5ad files
+        self.X_memmaps = [_memmap_dense(storage["X"]) for storage in self.storages]
 
         self.indices = np.hstack([np.arange(n_obs) for n_obs in self.n_obs_list])
         self.storage_idx = np.repeat(np.arange(len(self.storages)), self.n_obs_list)
@@ -68,8 +83,13 @@ class MappedDataset:
 
     def __getitem__(self, idx):
         obs_idx = self.indices[idx]
-        storage = self.storages[self.storage_idx[idx]]
-        out = [self.get_data_idx(storage, obs_idx)]
+        storage_idx = self.storage_idx[idx]
+        storage = self.storages[storage_idx]
+        X_memmap = self.X_memmaps[storage_idx]
+        if X_memmap is not None:
+            out = [np.asarray(X_memmap[obs_idx])]
+        else:
+            out = [self.get_data_idx(storage, obs_idx)]
         if self.label_keys is not None:
             for i, label in enumerate(self.label_keys):
                 label_idx = self.get_label_idx(storage, obs_idx, label)
@@ -199,6 +219,11 @@ class MappedDataset:
         for conn in self.conns:
             if hasattr(conn, "close"):
                 conn.close()
+        cache_manager = get_cache_manager()
+        if cache_manager is not None:
+            for path in self._pinned_paths:
+                cache_manager.unpin(path)
+        self._pinned_paths = []
         self._closed = True
 
     @property
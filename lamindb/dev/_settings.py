@@ -1,5 +1,6 @@
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Literal, Mapping, Tuple, Union
+from typing import Dict, Literal, Mapping, Optional, Tuple, Union
 
 import lamindb_setup as ln_setup
 from lamin_utils import logger
@@ -18,6 +19,35 @@ VERBOSITY_TO_STR: Dict[int, str] = dict(
 )
 
 
+@dataclass
+class ZarrWritePolicy:
+    """Chunking & compression policy for writing `AnnData` to zarr.
+
+    Directly modify `lamindb.settings.zarr_write_policy` or pass an instance
+    to the writer rather than changing the defaults here.
+
+    Examples:
+
+        >>> ln.settings.zarr_write_policy.chunk_bytes = 4 * 1024**2
+        >>> ln.settings.zarr_write_policy.compressor = "lz4"
+    """
+
+    chunk_bytes: int = 1024**2
+    """Target size of an uncompressed chunk in bytes (default 1 MiB).
+
+    Dense arrays are chunked along rows only, sparse `data` & `indices` are
+    chunked so that a chunk holds about as many rows as an `indptr` chunk.
+    Small chunks favor random row access.
+    """
+    compressor: Optional[str] = "zstd"
+    """Blosc compressor name (default `"zstd"`), `None` disables compression.
+
+    One of `["zstd", "lz4", "lz4hc", "blosclz", "zlib"]`.
+    """
+    clevel: int = 3
+    """Compression level from 0 to 9 (default 3)."""
+
+
 class Settings:
     """Settings.
 
@@ -28,6 +58,7 @@ class Settings:
     def __init__(self):
         self._verbosity_int: int = 1  # success-level logging
         logger.set_verbosity(self._verbosity_int)
+        self.zarr_write_policy = ZarrWritePolicy()
 
     upon_file_create_if_hash_exists: Literal[
         "warn_return_existing", "error", "warn_create_new"
@@ -45,6 +76,28 @@ class Settings:
 
     It speeds up file creation by about a factor 100.
     """
+    file_hash_cache: bool = True
+    """Cache hashes of local files on disk (default `True`).
+
+    Hashes are keyed by path, size, modification time and inode and stored in
+    the cache directory. Unchanged files aren't read again upon `ln.File(path)`.
+    """
+    cache_max_bytes: Optional[int] = None
+    """Budget of the cache of cloud files in bytes (default `None`, unbounded).
+
+    If exceeded, the least recently used files are evicted from the cache,
+    except for files that are in use through `backed()` or `mapped()`.
+
+    Examples:
+
+        >>> ln.settings.cache_max_bytes = 50 * 1024**3  # 50 GiB
+    """
+    upload_max_workers: int = 8
+    """Number of files uploaded concurrently by `ln.save(files)` (default `8`).
+
+    Saving many small files to the cloud is bound by latency rather than
+    bandwidth.
+    """
     upon_create_search_names: bool = True
     """To speed up creating Registry objects (default `True`).
 
@@ -66,6 +119,11 @@ class Settings:
 
     If `True`, the `key` is **not** used to construct file paths.
     """
+    zarr_write_policy: ZarrWritePolicy
+    """Chunking & compression when writing `AnnData` to zarr.
+
+    See :class:`~lamindb.dev.ZarrWritePolicy`.
+    """
 
     @property
     def storage(self) -> Union[Path, UPath]:
@@ -5,12 +5,27 @@
 
    hash_set
    hash_file
+   hash_files
+   HashingWriter
+   hash_dir
+   hash_md5s3
+   matches_etag_hash
 
 """
 
 import base64
 import hashlib
-from typing import Set, Tuple
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fsspec.implementations.local import LocalFileSystem
+from lamindb_setup.dev.upath import infer_filesystem
+
+from ._hash_cache import get_hash_cache
 
 
 def to_b64_str(bstr: bytes):
@@ -30,6 +45,24 @@ def hash_set(s: Set[str]) -> str:
 
 
 def hash_file(file_path, chunk_size=50 * 1024 * 1024) -> Tuple[str, str]:
+    """Hash a file from its first and last chunk.
+
+    Hashes of unchanged files are looked up in the hash cache if
+    `ln.settings.file_hash_cache` is `True`.
+    """
+    hash_cache = get_hash_cache()
+    if hash_cache is None:
+        return _hash_file(file_path, chunk_size)
+    path = os.path.realpath(file_path)
+    stat = os.stat(path)
+    hash_and_type = hash_cache.get(path, stat, chunk_size)
+    if hash_and_type is None:
+        hash_and_type = _hash_file(path, chunk_size)
+        hash_cache.set(path, stat, chunk_size, hash_and_type)
+    return hash_and_type
+
+
+def _hash_file(file_path, chunk_size) -> Tuple[str, str]:
     chunks = []
     with open(file_path, "rb") as fp:
         # read first chunk
@@ -50,3 +83,242 @@ def hash_file(file_path, chunk_size=50 * 1024 * 1024) -> Tuple[str, str]:
         digest = hashlib.sha1(digests).digest()
         hash_type = "sha1-fl"  # sha1 first last chunk
     return to_b64_str(digest)[:22], hash_type
+
+
+class HashingWriter(io.RawIOBase):
+    """Binary file writer that computes the hash of :func:`hash_file` on the fly.
+
+    Avoids reading a file back after serializing an in-memory object. Only
+    sequential writes can be hashed, :meth:`hash_and_type` returns `None` if
+    the writer seeked back.
+
+    Args:
+        file_path: The path of the file to write.
+        chunk_size: The chunk size used by :func:`hash_file`.
+    """
+
+    def __init__(self, file_path, chunk_size=50 * 1024 * 1024):
+        self._fp = open(file_path, "wb")
+        self._chunk_size = chunk_size
+        self._md5 = hashlib.md5()
+        self._first_chunk = bytearray()
+        self._last_chunk = bytearray()
+        self._size = 0
+        self._sequential = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._fp.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        position = self._fp.seek(offset, whence)
+        if position != self._size:
+            self._sequential = False
+        return position
+
+    def write(self, data) -> int:
+        data = memoryview(data).cast("B")
+        if self._sequential and self._fp.tell() != self._size:
+            self._sequential = False
+        n_written = self._fp.write(data)
+        if self._sequential:
+            self._size += n_written
+            chunk_size = self._chunk_size
+            # the md5 of the whole file is only needed if it fits into a chunk
+            if self._size <= chunk_size:
+                self._md5.update(data)
+            if len(self._first_chunk) < chunk_size:
+                self._first_chunk += data[: chunk_size - len(self._first_chunk)]
+            self._last_chunk += data
+            # trim lazily to avoid copying the buffer on every write
+            if len(self._last_chunk) > 2 * chunk_size:
+                del self._last_chunk[:-chunk_size]
+        return n_written
+
+    def flush(self) -> None:
+        self._fp.flush()
+
+    def close(self) -> None:
+        if not self.closed:
+            super().close()
+            self._fp.close()
+
+    def hash_and_type(self) -> Optional[Tuple[str, str]]:
+        """The hash and hash type of the written file."""
+        if not self._sequential:
+            return None
+        if self._size <= self._chunk_size:
+            return to_b64_str(self._md5.digest())[:22], "md5"
+        chunks = [
+            bytes(self._first_chunk),
+            bytes(self._last_chunk[-self._chunk_size :]),
+        ]
+        digests = b"".join(hashlib.sha1(chunk).digest() for chunk in chunks)
+        return to_b64_str(hashlib.sha1(digests).digest())[:22], "sha1-fl"
+
+
+def hash_files(
+    file_paths: Iterable,
+    chunk_size=50 * 1024 * 1024,
+    max_workers: Optional[int] = None,
+) -> List[Tuple[str, str]]:
+    """Compute :func:`hash_file` for many files on a thread pool.
+
+    hashlib and file reads release the GIL, hence threads saturate the disk.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        hashes = list(
+            executor.map(partial(hash_file, chunk_size=chunk_size), file_paths)
+        )
+    # the new entries of the hash cache are written in one go
+    hash_cache = get_hash_cache()
+    if hash_cache is not None:
+        hash_cache.flush()
+    return hashes
+
+
+def _md5_part(file_path, offset: int, size: int) -> bytes:
+    with open(file_path, "rb") as fp:
+        fp.seek(offset)
+        return hashlib.md5(fp.read(size)).digest()
+
+
+def hash_md5s3(
+    file_path, chunk_size=50 * 1024 * 1024, max_workers: Optional[int] = None
+) -> Tuple[str, str]:
+    """Compute the ETag of a multipart upload to S3 locally.
+
+    S3 hashes each part and then the concatenated part digests. The parts are
+    hashed in parallel. The result has the format of `md5-n` hashes of
+    :class:`~lamindb.File`.
+    """
+    size = os.path.getsize(file_path)
+    offsets = range(0, max(size, 1), chunk_size)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        digests = list(
+            executor.map(
+                lambda offset: _md5_part(file_path, offset, chunk_size), offsets
+            )
+        )
+    digest = hashlib.md5(b"".join(digests)).digest()
+    return f"{to_b64_str(digest)}-{len(digests)}", "md5-n"
+
+
+# part sizes of s3fs (default of lamindb uploads), boto3 & the aws cli, others
+MULTIPART_CHUNK_SIZES = [
+    size * 1024 * 1024 for size in (50, 8, 5, 16, 15, 64, 100, 128)
+]
+
+
+def matches_etag_hash(
+    file_path, hash: str, hash_type: str, computed: Optional[Dict] = None
+) -> bool:
+    """Check whether a local file has the content of an object in the cloud.
+
+    For `md5-n` hashes of multipart uploads, the part size isn't stored.
+    Commonly used part sizes that are consistent with the number of parts are
+    tried. Pass the same dict as `computed` to compare a file against many
+    hashes, so that it's hashed only once per part size.
+    """
+    if computed is None:
+        computed = {}
+    if hash_type == "md5":
+        if "md5" not in computed:
+            computed["md5"] = to_b64_str(bytes.fromhex(_md5_file(file_path)))
+        return computed["md5"] == hash
+    if hash_type != "md5-n" or "-" not in hash:
+        return False
+    n_parts = int(hash.rsplit("-", 1)[1])
+    size = os.path.getsize(file_path)
+    chunk_sizes = MULTIPART_CHUNK_SIZES + [
+        # part sizes computed from the number of parts, rounded to MiB
+        -(-size // (n_parts * 1024 * 1024))
+        * 1024
+        * 1024
+    ]
+    tried = set()
+    for chunk_size in chunk_sizes:
+        if chunk_size in tried or -(-size // chunk_size) != n_parts:
+            continue
+        tried.add(chunk_size)
+        if chunk_size not in computed:
+            computed[chunk_size] = hash_md5s3(file_path, chunk_size)[0]
+        if computed[chunk_size] == hash:
+            return True
+    return False
+
+
+def _md5_file(file_path, block_size=8 * 1024 * 1024) -> str:
+    """Hex md5 of the full content of a file, looked up in the hash cache."""
+    hash_cache = get_hash_cache()
+    path = os.path.realpath(file_path)
+    if hash_cache is not None:
+        stat = os.stat(path)
+        # chunk_size 0 flags a hash over the full content
+        hash_and_type = hash_cache.get(path, stat, 0)
+        if hash_and_type is not None:
+            return hash_and_type[0]
+    md5 = hashlib.md5()
+    with open(path, "rb") as fp:
+        for block in iter(partial(fp.read, block_size), b""):
+            md5.update(block)
+    digest = md5.hexdigest()
+    if hash_cache is not None:
+        hash_cache.set(path, stat, 0, (digest, "md5"))
+    return digest
+
+
+def _md5_from_info(info: dict) -> Optional[str]:
+    # S3 ETags are hex md5 or the multipart "md5-n"
+    etag = info.get("ETag", info.get("etag"))
+    if etag is not None:
+        return etag.strip('"')
+    # GCS stores a base64 md5
+    md5_hash = info.get("md5Hash")
+    if md5_hash is not None:
+        return base64.b64decode(md5_hash).hex()
+    return None
+
+
+def hash_dir(
+    path, max_workers: Optional[int] = None
+) -> Tuple[Optional[str], Optional[str], int]:
+    """Merkle-style hash of a directory, e.g., a zarr store.
+
+    Combines the md5 of every file with its relative path. Local files are
+    hashed in parallel, in the cloud, the checksums of the object metadata
+    are used and nothing is downloaded.
+
+    Returns the hash, the hash type and the total size. The hash is `None`
+    if the directory is empty or the checksums aren't available.
+    """
+    fs, path_str = infer_filesystem(path)
+    path_str = path_str.rstrip("/")
+    if isinstance(fs, LocalFileSystem):
+        root = Path(path_str)
+        if not root.is_dir():
+            return None, None, 0
+        file_paths = [p for p in root.rglob("*") if p.is_file()]
+        relpaths = [p.relative_to(root).as_posix() for p in file_paths]
+        size = sum(p.stat().st_size for p in file_paths)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            leaves: List[Optional[str]] = list(executor.map(_md5_file, file_paths))
+    else:
+        # the keys of find() don't have a protocol
+        root_str = fs._strip_protocol(path_str).rstrip("/")
+        infos = fs.find(root_str, detail=True)
+        relpaths, leaves, size = [], [], 0
+        for key, info in infos.items():
+            relpaths.append(key[len(root_str) :].lstrip("/"))
+            leaves.append(_md5_from_info(info))
+            size += info.get("size", 0)
+    if len(leaves) == 0 or None in leaves:
+        return None, None, size
+    lines = sorted(f"{relpath}:{leaf}" for relpath, leaf in zip(relpaths, leaves))
+    digest = hashlib.md5("\n".join(lines).encode("utf-8")).digest()
+    return to_b64_str(digest)[:22], "md5-d", size
@@ -0,0 +1,222 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Literal, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from fsspec import AbstractFileSystem
+from fsspec.implementations.local import LocalFileSystem
+from lamindb_setup.dev.upath import UPath, infer_filesystem
+
+# a pyarrow expression or filters in disjunctive normal form as in
+# pyarrow.parquet, e.g., [("a", ">", 1)]
+FilterType = Union[ds.Expression, List[Tuple], List[List[Tuple]]]
+
+
+def _index_columns(schema: pa.Schema) -> List[str]:
+    # columns that pandas stored the index in, a range index isn't stored
+    pandas_metadata = schema.pandas_metadata
+    if pandas_metadata is None:
+        return []
+    return [
+        column for column in pandas_metadata["index_columns"] if isinstance(column, str)
+    ]
+
+
+def unify_schemas(
+    schemas: List[pa.Schema], join: Literal["inner", "outer"] = "outer"
+) -> pa.Schema:
+    """Unify the schemas of several parquet files.
+
+    An outer join keeps all columns, an inner join only the columns that all
+    schemas share.
+    """
+    schema = pa.unify_schemas(schemas)
+    if join == "outer":
+        return schema
+    names = set.intersection(*(set(schema.names) for schema in schemas))
+    return pa.schema(
+        [field for field in schema if field.name in names], metadata=schema.metadata
+    )
+
+
+def to_expression(filter: Optional[FilterType]) -> Optional[ds.Expression]:
+    if filter is None or isinstance(filter, ds.Expression):
+        return filter
+    return pq.filters_to_expression(filter)
+
+
+def _resolve_filesystem(
+    filepaths: List[Union[Path, UPath]]
+) -> Tuple[Optional[AbstractFileSystem], List[str]]:
+    filesystems, paths = zip(*(infer_filesystem(filepath) for filepath in filepaths))
+    if all(isinstance(fs, LocalFileSystem) for fs in filesystems):
+        return None, [Path(path).as_posix() for path in paths]
+    protocols = {str(fs.protocol) for fs in filesystems}
+    if len(protocols) > 1:
+        raise ValueError(f"Can only access files in one filesystem, not {protocols}")
+    fs = filesystems[0]
+    return fs, [fs._strip_protocol(path) for path in paths]
+
+
+def _open_parquet_dataset(
+    filepaths: List[Union[Path, UPath]], join: Literal["inner", "outer"] = "outer"
+) -> Tuple[ds.Dataset, List[pa.Schema], List[int]]:
+    filesystem, paths = _resolve_filesystem(filepaths)
+    dataset = ds.dataset(paths, filesystem=filesystem, format="parquet")
+    with ThreadPoolExecutor() as executor:
+        footers = list(
+            executor.map(
+                lambda fragment: (fragment.physical_schema, fragment.metadata.num_rows),
+                dataset.get_fragments(),
+            )
+        )
+    schemas = [schema for schema, _ in footers]
+    n_rows = [n for _, n in footers]
+    schema = unify_schemas(schemas, join=join)
+    dataset = ds.dataset(paths, schema=schema, filesystem=filesystem, format="parquet")
+    return dataset, schemas, n_rows
+
+
+def open_parquet_dataset(
+    filepaths: List[Union[Path, UPath]], join: Literal["inner", "outer"] = "outer"
+) -> ds.Dataset:
+    """Open parquet files in local or cloud storage as one arrow dataset.
+
+    Only the footers of the files are read to unify their schemas.
+    """
+    return _open_parquet_dataset(filepaths, join=join)[0]
+
+
+def scan_parquet_dataset(
+    filepaths: List[Union[Path, UPath]],
+    columns: Optional[List[str]] = None,
+    filter: Optional[FilterType] = None,
+    batch_size: Optional[int] = None,
+) -> ds.Scanner:
+    """Scan parquet files with column projection and predicate pushdown."""
+    dataset = open_parquet_dataset(filepaths)
+    kwargs = {} if batch_size is None else {"batch_size": batch_size}
+    return dataset.scanner(columns=columns, filter=to_expression(filter), **kwargs)
+
+
+def _range_index(schema: pa.Schema, n_rows: int) -> pd.RangeIndex:
+    # the range index that pd.read_parquet would create for a file
+    pandas_metadata = schema.pandas_metadata
+    if pandas_metadata is not None:
+        for column in pandas_metadata["index_columns"]:
+            if isinstance(column, dict) and column["kind"] == "range":
+                index = pd.RangeIndex(
+                    column["start"], column["stop"], column["step"], name=column["name"]
+                )
+                if len(index) == n_rows:
+                    return index
+    return pd.RangeIndex(n_rows)
+
+
+def load_parquet_dataset(
+    filepaths: List[Union[Path, UPath]],
+    join: Literal["inner", "outer"] = "outer",
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Load and concatenate parquet files as one arrow dataset.
+
+    The files are read with multiple threads, only the requested `columns`
+    are read, and the result is converted to a `DataFrame` in one go.
+
+    The result is the same as concatenating the files with `pd.concat`: the
+    index of each file is kept and values of columns that a file lacks are
+    `NaN`. Raises a `ValueError` if the files store their indices differently.
+    """
+    dataset, schemas, n_rows = _open_parquet_dataset(filepaths, join=join)
+    index_columns = _index_columns(dataset.schema)
+    if any(_index_columns(schema) != index_columns for schema in schemas):
+        raise ValueError("Files store their indices differently.")
+    if columns is not None:
+        columns = list(columns) + [
+            column for column in index_columns if column not in columns
+        ]
+    table = dataset.to_table(columns=columns, use_threads=True)
+    df = table.to_pandas()
+    if not index_columns:
+        indices = [_range_index(schema, n) for schema, n in zip(schemas, n_rows)]
+        df.index = indices[0].append(indices[1:])
+    start = 0
+    for schema, n in zip(schemas, n_rows):
+        # pd.concat fills object columns that a file lacks with NaN, not None
+        missing = [
+            i
+            for i, (column, dtype) in enumerate(df.dtypes.items())
+            if column not in schema.names and dtype == object
+        ]
+        if len(missing) > 0:
+            df.iloc[start : start + n, missing] = np.nan
+        start += n
+    return df
+
+
+def is_pushdown(kwargs: dict) -> bool:
+    """Whether a parquet file can be read with pushdown from storage.
+
+    That's the case if a selection is passed and no other arguments of
+    `pd.read_parquet`, like `engine`.
+    """
+    return len(kwargs) > 0 and set(kwargs) <= {"columns", "filters"}
+
+
+def read_parquet(filepath: Union[Path, UPath], **kwargs) -> pd.DataFrame:
+    """Read a parquet file from local or cloud storage.
+
+    If only `columns` and `filters` are passed, just the footer and the
+    column chunks of the selected columns and of the row groups that can
+    match `filters` are read. Otherwise, it's read by `pd.read_parquet`.
+    """
+    if not is_pushdown(kwargs):
+        return pd.read_parquet(filepath, **kwargs)
+    filesystem, (path,) = _resolve_filesystem([filepath])
+    table = pq.read_table(
+        path,
+        columns=kwargs.get("columns"),
+        filters=kwargs.get("filters"),
+        filesystem=filesystem,
+        use_pandas_metadata=True,
+    )
+    return table.to_pandas()
+
+
+def iter_batches(
+    filepath: Union[Path, UPath],
+    batch_size: int = 100000,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Iterate over a csv, tsv or parquet file in batches of rows.
+
+    The file is streamed from local or cloud storage, so that only about one
+    batch is held in memory at a time.
+    """
+    suffix = Path(filepath).suffix
+    if suffix not in {".csv", ".tsv", ".parquet"}:
+        raise ValueError(
+            f"Can only iterate over .csv, .tsv and .parquet files, not {suffix}"
+        )
+    fs, path = infer_filesystem(filepath)
+    with fs.open(path, "rb") as f:
+        if suffix == ".parquet":
+            batches = pq.ParquetFile(f).iter_batches(
+                batch_size=batch_size, columns=columns, use_pandas_metadata=True
+            )
+            for batch in batches:
+                yield batch.to_pandas()
+            return None
+        # the same dtypes are inferred as by File.load(), batch by batch
+        with pd.read_csv(
+            f,
+            sep="\t" if suffix == ".tsv" else ",",
+            usecols=columns,
+            chunksize=batch_size,
+        ) as reader:
+            for df in reader:
+                yield df
@@ -1,27 +1,46 @@
 import inspect
+from copy import copy
 from dataclasses import dataclass
 from functools import cached_property
 from itertools import chain
 from pathlib import Path
-from typing import Callable, Dict, Mapping, Union
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import h5py
 import numpy as np
 import pandas as pd
-from anndata import AnnData
+import scipy.sparse as sparse
+from anndata import AnnData, concat
 from anndata import __version__ as anndata_version
 from anndata._core.index import Index, _normalize_indices
 from anndata._core.views import _resolve_idx
 from anndata._io.h5ad import read_dataframe_legacy as read_dataframe_legacy_h5
+from anndata._io.specs import write_elem
 from anndata._io.specs.registry import get_spec, read_elem, read_elem_partial
 from anndata.compat import _read_attr
 from fsspec.core import OpenFile
 from fsspec.implementations.local import LocalFileSystem
 from lamin_utils import logger
-from lamindb_setup.dev.upath import UPath, infer_filesystem
+from lamindb_setup.dev.upath import (
+    LocalPathClasses,
+    UPath,
+    create_path,
+    infer_filesystem,
+)
 from lnschema_core import File
 from packaging import version
 
+from lamindb.dev.storage._cache import get_cache_manager
 from lamindb.dev.storage.file import filepath_from_file
 
 anndata_version_parse = version.parse(anndata_version)
@@ -139,6 +158,10 @@ registry = Registry()
 @registry.register_open("h5py")
 def open(filepath: Union[UPath, Path, str]):
     fs, file_path_str = infer_filesystem(filepath)
+    if isinstance(fs, LocalFileSystem):
+        # this is faster than through fsspec for local
+        # and allows to memory-map contiguous arrays, see _memmap_dense
+        return None, h5py.File(file_path_str, mode="r")
     conn = fs.open(file_path_str, mode="rb")
     try:
         storage = h5py.File(conn, mode="r")
@@ -198,6 +221,38 @@ def keys(storage: h5py.File):
     return attrs_keys
 
 
+def _memmap_dense(elem) -> Optional[np.memmap]:
+    """Memory-map a dense h5py dataset if it's stored contiguously in a local file.
+
+    Reading from the memory map is zero-copy and goes through the OS page cache.
+    """
+    if not isinstance(elem, h5py.Dataset) or elem.file.driver != "sec2":
+        return None
+    # chunked datasets are the only ones that can be compressed
+    if elem.chunks is not None or elem.dtype.kind not in "biufc" or elem.size == 0:
+        return None
+    offset = elem.id.get_offset()
+    if offset is None:
+        return None
+    return np.memmap(
+        elem.file.filename, mode="r", dtype=elem.dtype, offset=offset, shape=elem.shape
+    )
+
+
+def _subset_dense(array: np.ndarray, indices):
+    oidx, vidx = indices
+    if isinstance(oidx, np.ndarray) and isinstance(vidx, np.ndarray):
+        return array[np.ix_(oidx, vidx)]
+    return array[oidx, vidx]
+
+
+@registry.register("h5py")
+def create_resizable(group: h5py.Group, key: str, dtype, chunk_len: int):
+    return group.create_dataset(
+        key, shape=(0,), maxshape=(None,), dtype=dtype, chunks=(chunk_len,)
+    )
+
+
 ArrayTypes = [h5py.Dataset]
 GroupTypes = [h5py.Group]
 StorageTypes = [h5py.File]
@@ -214,6 +269,8 @@ except ImportError:
 if ZARR_INSTALLED:
     from anndata._io.zarr import read_dataframe_legacy as read_dataframe_legacy_zarr
 
+    from ._zarr import open_zarr_group
+
     ArrayTypes.append(zarr.Array)
     GroupTypes.append(zarr.Group)
     StorageTypes.append(zarr.Group)
@@ -227,7 +284,7 @@ if ZARR_INSTALLED:
             open_obj = file_path_str
         else:
             open_obj = fs.get_mapper(file_path_str, check=True)
-        storage = zarr.open(open_obj, mode="r")
+        storage = open_zarr_group(open_obj)
         return conn, storage
 
     @registry.register("zarr")
@@ -268,6 +325,7 @@ if ZARR_INSTALLED:
                 return read_elem_partial(elem, indices=indices)
 
     # this is needed because accessing zarr.Group.keys() directly is very slow
+    # for consolidated metadata, the store only lists the metadata keys
     @registry.register("zarr")
     def keys(storage: zarr.Group):  # noqa
         paths = storage._store.keys()
@@ -308,6 +366,10 @@ if ZARR_INSTALLED:
 
         return {attr: keys for attr, keys in attrs_keys.items() if len(keys) > 0}
 
+    @registry.register("zarr")
+    def create_resizable(group: zarr.Group, key: str, dtype, chunk_len: int):  # noqa
+        return group.create_dataset(key, shape=(0,), dtype=dtype, chunks=(chunk_len,))
+
 
 ArrayTypes = tuple(ArrayTypes)  # type: ignore
 GroupTypes = tuple(GroupTypes)  # type: ignore
@@ -364,6 +426,85 @@ def _safer_read_index(elem):
         raise ValueError(f"Unknown elem type {type(elem)} when reading indices.")
 
 
+def _iter_row_chunks(oidx, n_ref: int, chunk_size: int):
+    if isinstance(oidx, (int, np.integer)):
+        oidx = slice(oidx, oidx + 1)
+    if isinstance(oidx, slice):
+        start, stop, step = oidx.indices(n_ref)
+        # contiguous selections are read as slices, which is much faster
+        if step == 1:
+            for chunk_start in range(start, stop, chunk_size):
+                yield slice(chunk_start, min(chunk_start + chunk_size, stop))
+            return None
+        oidx = np.arange(start, stop, step)
+    for chunk_start in range(0, len(oidx), chunk_size):
+        yield oidx[chunk_start : chunk_start + chunk_size]
+
+
+def _append(array, values: np.ndarray):
+    n = array.shape[0]
+    array.resize((n + len(values),))
+    array[n:] = values
+
+
+def _write_rows(group, key: str, elem, oidx, vidx, n_ref: int, chunk_size: int):
+    """Copy the selected rows of a storage element chunk by chunk."""
+    is_dense = isinstance(elem, ArrayTypes) and len(elem.shape) == 2
+    is_sparse = isinstance(elem, GroupTypes) and (
+        get_spec(elem).encoding_type in ("csr_matrix", "csc_matrix")
+        or "h5sparse_format" in elem.attrs
+        or "indptr" in elem
+    )
+    chunks = _iter_row_chunks(oidx, n_ref, chunk_size)
+    first_chunk = next(chunks, None)
+    # dataframes and other elements are small enough to be copied in one go
+    if first_chunk is None or not (is_dense or is_sparse):
+        write_elem(
+            group, key, _to_memory(registry.safer_read_partial(elem, (oidx, vidx)))
+        )
+        return None
+    n_rows = len(np.arange(n_ref)[oidx])
+    if is_dense:
+        array = None
+        row = 0
+        for rows in chain([first_chunk], chunks):
+            values = registry.safer_read_partial(elem, indices=(rows, vidx))
+            if array is None:
+                array = group.create_dataset(
+                    key, shape=(n_rows, values.shape[1]), dtype=values.dtype
+                )
+                array.attrs["encoding-type"] = "array"
+                array.attrs["encoding-version"] = "0.2.0"
+            array[row : row + values.shape[0]] = values
+            row += values.shape[0]
+        return None
+    sparse_group = group.create_group(key)
+    sparse_group.attrs["encoding-type"] = "csr_matrix"
+    sparse_group.attrs["encoding-version"] = "0.1.0"
+    data, indices, n_cols = None, None, None
+    indptr = [np.zeros(1, dtype=np.int64)]
+    nnz = 0
+    for rows in chain([first_chunk], chunks):
+        values = sparse.csr_matrix(
+            registry.safer_read_partial(elem, indices=(rows, vidx))
+        )
+        if data is None:
+            chunk_len = max(values.nnz, 1)
+            data = registry.create_resizable(
+                sparse_group, "data", values.data.dtype, chunk_len
+            )
+            indices = registry.create_resizable(
+                sparse_group, "indices", values.indices.dtype, chunk_len
+            )
+            n_cols = values.shape[1]
+        _append(data, values.data)
+        _append(indices, values.indices)
+        indptr.append(values.indptr[1:].astype(np.int64) + nnz)
+        nnz += values.nnz
+    sparse_group.create_dataset("indptr", data=np.concatenate(indptr))
+    sparse_group.attrs["shape"] = [n_rows, n_cols]
+
+
 class _MapAccessor:
     def __init__(self, elem, name, indices=None):
         self.elem = elem
@@ -423,6 +564,9 @@ class _AnnDataAttrsMixin:
     @cached_property
     def X(self):
         indices = getattr(self, "indices", None)
+        X_memmap = _memmap_dense(self.storage["X"])  # type: ignore
+        if X_memmap is not None:
+            return X_memmap if indices is None else _subset_dense(X_memmap, indices)
         if indices is not None:
             return registry.safer_read_partial(self.storage["X"], indices=indices)
         else:
@@ -511,6 +655,96 @@ class _AnnDataAttrsMixin:
         adata = AnnData(**self.to_dict())
         return adata
 
+    def _write_elems(self, group, chunk_size: int):
+        indices = getattr(self, "indices", None)
+        if indices is None:
+            indices = (slice(None), slice(None))
+        oidx, vidx = indices
+        n_ref = getattr(self, "_ref_shape", self.shape)[0]
+        storage = self.storage
+
+        _write_rows(group, "X", storage["X"], oidx, vidx, n_ref, chunk_size)  # type: ignore # noqa
+        for attr in ("obs", "var"):
+            if attr in self._attrs_keys:
+                write_elem(group, attr, getattr(self, attr))
+        if "uns" in self._attrs_keys:
+            write_elem(group, "uns", dict(self.uns))
+        for attr in ("obsm", "obsp", "layers"):
+            if attr not in self._attrs_keys:
+                continue
+            attr_group = group.create_group(attr)
+            attr_group.attrs["encoding-type"] = "dict"
+            attr_group.attrs["encoding-version"] = "0.1.0"
+            for key in self._attrs_keys[attr]:
+                elem = storage[attr][key]  # type: ignore
+                if attr == "obsm":
+                    elem_vidx = slice(None)
+                elif attr == "obsp":
+                    elem_vidx = oidx
+                else:
+                    elem_vidx = vidx
+                _write_rows(attr_group, key, elem, oidx, elem_vidx, n_ref, chunk_size)
+        for attr in ("varm", "varp"):
+            if attr in self._attrs_keys:
+                get_attr = getattr(self, attr)
+                write_elem(
+                    group,
+                    attr,
+                    {key: _to_memory(get_attr[key]) for key in self._attrs_keys[attr]},
+                )
+        if "raw" in self._attrs_keys:
+            raw_group = group.create_group("raw")
+            raw_group.attrs["encoding-type"] = "raw"
+            raw_group.attrs["encoding-version"] = "0.1.0"
+            self.raw._write_elems(raw_group, chunk_size)
+
+    def write(
+        self,
+        filepath: Union[UPath, Path, str],
+        format: Optional[Literal["h5ad", "zarr"]] = None,
+        chunk_size: int = 10000,
+    ) -> Union[UPath, Path]:
+        """Write the (subsetted) AnnData object to a new file without loading it.
+
+        Large elements (`X`, `layers`, `obsm` and `obsp`) are copied in chunks
+        of `chunk_size` rows, so that memory consumption stays bounded.
+
+        The written file can be registered via `ln.File(filepath)`.
+
+        Args:
+            filepath: The path of the new file.
+            format: One of `"h5ad"` and `"zarr"`, inferred from the suffix of
+                `filepath` if not passed. `"h5ad"` can only be written locally.
+            chunk_size: The number of rows that are copied at once.
+        """
+        filepath = create_path(filepath)
+        if format is None:
+            format = "zarr" if filepath.suffix in (".zarr", ".zrad") else "h5ad"
+        if format == "h5ad":
+            if not isinstance(filepath, LocalPathClasses):
+                raise ValueError("Can only write h5ad to a local path, use zarr.")
+            target = h5py.File(filepath, mode="w")
+        elif format == "zarr":
+            if not ZARR_INSTALLED:
+                raise ImportError("Please install zarr: pip install zarr")
+            fs, file_path_str = infer_filesystem(filepath)
+            if isinstance(fs, LocalFileSystem):
+                target = zarr.open(file_path_str, mode="w")
+            else:
+                target = zarr.open(fs.get_mapper(file_path_str, create=True), mode="w")
+        else:
+            raise ValueError(f"format should be 'h5ad' or 'zarr', not '{format}'.")
+        target.attrs["encoding-type"] = "anndata"
+        target.attrs["encoding-version"] = "0.1.0"
+        try:
+            self._write_elems(target, chunk_size)
+            if format == "zarr":
+                zarr.consolidate_metadata(target.store)
+        finally:
+            if hasattr(target, "close"):
+                target.close()
+        return filepath
+
 
 class AnnDataAccessorSubset(_AnnDataAttrsMixin):
     def __init__(self, storage, indices, attrs_keys, obs_names, var_names, ref_shape):
@@ -621,6 +855,8 @@ class AnnDataAccessor(_AnnDataAttrsMixin):
         self._var_names = _safer_read_index(self.storage["var"])  # type: ignore
 
         self._closed = False
+        # a cached file that is pinned while it's accessed
+        self._pinned_path: Optional[Path] = None
 
     def close(self):
         """Closes the connection."""
@@ -628,6 +864,11 @@ class AnnDataAccessor(_AnnDataAttrsMixin):
             self.storage.close()
         if hasattr(self, "_conn") and hasattr(self._conn, "close"):
             self._conn.close()
+        if getattr(self, "_pinned_path", None) is not None:
+            cache_manager = get_cache_manager()
+            if cache_manager is not None:
+                cache_manager.unpin(self._pinned_path)
+            self._pinned_path = None
         self._closed = True
 
     @property
@@ -671,6 +912,192 @@ class AnnDataAccessor(_AnnDataAttrsMixin):
         )
 
 
+def _read_obs_columns(
+    accessor: AnnDataAccessor, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    if columns is None:
+        return accessor.obs
+    obs = accessor.storage["obs"]  # type: ignore
+    if isinstance(obs, GroupTypes):
+        # only read the requested columns
+        return pd.DataFrame(
+            {column: read_elem(obs[column]) for column in columns if column in obs},
+            index=accessor.obs_names,
+        )
+    return accessor.obs[[column for column in columns if column in accessor.obs]]
+
+
+class AnnDataConcatAccessor:
+    """Lazy concatenation of cloud-backed AnnData objects along `obs`.
+
+    Indexing selects observations and variables of the concatenation without
+    reading any data, `.to_memory()` then reads the selection file by file.
+
+    Args:
+        accessors: The accessors of the AnnData objects.
+        keys: The labels of the AnnData objects, stored in the `label` column
+            of `obs`.
+        join: How to join the variables, `"inner"` or `"outer"`.
+        label: The column of `obs` that stores the keys.
+    """
+
+    def __init__(
+        self,
+        accessors: List[AnnDataAccessor],
+        keys: List[str],
+        join: Literal["inner", "outer"] = "outer",
+        label: str = "file_uid",
+    ):
+        self._accessors = accessors
+        self._keys = keys
+        self._join = join
+        self._label = label
+
+        self._offsets = np.cumsum([0] + [accessor.shape[0] for accessor in accessors])
+        self._all_obs_names = accessors[0].obs_names.append(
+            [accessor.obs_names for accessor in accessors[1:]]
+        )
+        # joined the same way as in anndata.concat
+        var_names = accessors[0].var_names
+        for accessor in accessors[1:]:
+            if join == "inner":
+                var_names = var_names.intersection(accessor.var_names)
+            else:
+                var_names = var_names.union(accessor.var_names)
+        # the selection, positions in the concatenation and variable names
+        self._oidx = np.arange(self._offsets[-1])
+        self._var_names = var_names
+
+    def _subset(self, oidx: np.ndarray, var_names: pd.Index) -> "AnnDataConcatAccessor":
+        subset = copy(self)
+        # reset the cached properties
+        subset.__dict__.pop("obs", None)
+        subset.__dict__.pop("shape", None)
+        subset._oidx, subset._var_names = oidx, var_names
+        return subset
+
+    def _split(self) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        # the positions in the selection and in the file for every file
+        for i in range(len(self._accessors)):
+            start, stop = self._offsets[i], self._offsets[i + 1]
+            mask = (self._oidx >= start) & (self._oidx < stop)
+            if mask.any():
+                yield i, np.flatnonzero(mask), self._oidx[mask] - start
+
+    def __getitem__(self, index: Index) -> "AnnDataConcatAccessor":
+        """Access a subset of the concatenated AnnData objects."""
+        oidx, vidx = _normalize_indices(index, self.obs_names, self.var_names)
+        new_oidx = np.atleast_1d(self._oidx[oidx])
+        new_var_names = self._var_names[np.atleast_1d(np.arange(self.shape[1])[vidx])]
+        return self._subset(new_oidx, new_var_names)
+
+    def __repr__(self):
+        """Description of the AnnDataConcatAccessor object."""
+        n_obs, n_vars = self.shape
+        descr = f"AnnDataConcatAccessor object with n_obs × n_vars = {n_obs} × {n_vars}"
+        descr += f"\n  constructed for {len(self._accessors)} AnnData objects"
+        return descr
+
+    @property
+    def obs_names(self) -> pd.Index:
+        return self._all_obs_names[self._oidx]
+
+    @property
+    def var_names(self) -> pd.Index:
+        return self._var_names
+
+    @cached_property
+    def shape(self):
+        return len(self._oidx), len(self._var_names)
+
+    @cached_property
+    def obs(self) -> pd.DataFrame:
+        return self.read_obs()
+
+    def read_obs(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read `obs` of the selection, optionally only some of its columns."""
+        frames, positions = [], []
+        for i, selected, local in self._split():
+            frame = _read_obs_columns(self._accessors[i], columns).iloc[local].copy()
+            frame[self._label] = self._keys[i]
+            frames.append(frame)
+            positions.append(selected)
+        if len(frames) == 0:
+            return pd.DataFrame(index=self.obs_names)
+        obs = pd.concat(frames)
+        obs = obs.iloc[np.argsort(np.concatenate(positions), kind="stable")]
+        obs[self._label] = pd.Categorical(obs[self._label], categories=self._keys)
+        return obs
+
+    def to_memory(self) -> AnnData:
+        """Read the selection into memory.
+
+        Only the selected observations and variables are read, one file at a
+        time.
+        """
+        adatas, positions, keys = [], [], []
+        for i, selected, local in self._split():
+            accessor = self._accessors[i]
+            # backends need increasing indices, they are reordered in memory
+            unique, inverse = np.unique(local, return_inverse=True)
+            if len(unique) == accessor.shape[0]:
+                oidx = slice(None)
+            elif unique[-1] - unique[0] + 1 == len(unique):
+                oidx = slice(unique[0], unique[-1] + 1)
+            else:
+                oidx = unique
+            vidx = accessor.var_names.get_indexer(self._var_names)
+            vidx = np.sort(vidx[vidx >= 0])
+            if len(vidx) == accessor.shape[1]:
+                vidx = slice(None)
+            adata = accessor[oidx, vidx].to_memory()
+            if len(unique) != len(local) or (np.diff(local) < 0).any():
+                adata = adata[inverse]
+            adatas.append(adata)
+            positions.append(selected)
+            keys.append(self._keys[i])
+        if len(adatas) == 0:
+            return AnnData(
+                obs=pd.DataFrame(index=self.obs_names),
+                var=pd.DataFrame(index=self.var_names),
+            )
+        adata = concat(adatas, join=self._join, label=self._label, keys=keys)
+        missing = self._var_names.difference(adata.var_names)
+        if len(missing) > 0:
+            # variables that are only in files outside of the selection
+            shape = (0, len(missing))
+            X = (
+                sparse.csr_matrix(shape)
+                if sparse.issparse(adata.X)
+                else np.empty(shape)
+            )
+            padding = AnnData(X=X, var=pd.DataFrame(index=missing))
+            adata = concat(
+                [adata, padding], join="outer", merge="first", uns_merge="first"
+            )
+        order = np.argsort(np.concatenate(positions), kind="stable")
+        if (np.diff(order) < 0).any():
+            adata = adata[order]
+        if not adata.var_names.equals(self._var_names):
+            adata = adata[:, self._var_names]
+        return adata.copy() if adata.is_view else adata
+
+    def close(self):
+        """Closes the connections of all files."""
+        for accessor in self._accessors:
+            accessor.close()
+
+    @property
+    def closed(self):
+        return all(accessor.closed for accessor in self._accessors)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 @dataclass
 class BackedAccessor:
     """h5py.File or zarr.Group accessor."""
@@ -680,6 +1107,13 @@ class BackedAccessor:
     storage: StorageType
     """The storage access."""
 
+    def close(self):
+        """Closes the connection."""
+        if hasattr(self.storage, "close"):
+            self.storage.close()
+        if hasattr(self.connection, "close"):
+            self.connection.close()
+
 
 def backed_access(
     file_or_filepath: Union[File, Path]
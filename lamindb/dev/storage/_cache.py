@@ -0,0 +1,473 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
+
+import lamindb_setup
+from lamindb_setup.dev.upath import LocalPathClasses, UPath
+from lnschema_core.models import File
+
+from lamindb.dev._cache_db import cache_db_path, get_cache_database
+from lamindb.dev._settings import settings
+from lamindb.dev.hashing import hash_file, matches_etag_hash
+
+
+def _pid_alive(pid: int) -> bool:
+    if sys.platform == "win32":
+        # os.kill() would send a signal on Windows instead of checking the pid
+        import ctypes
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        process_query_limited_information = 0x1000
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            # access is denied for processes of other users
+            return ctypes.get_last_error() == 5
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # the process exists but belongs to another user
+        return True
+    return True
+
+
+class CacheManager:
+    """Size-bounded cache of cloud files.
+
+    Accesses of cached files are recorded in a small database so that the
+    least recently used files can be evicted once the cache exceeds
+    `ln.settings.cache_max_bytes`, without scanning the cache directory.
+
+    Files that are in use, e.g., through `backed()` or `mapped()`, are pinned
+    by the process using them and aren't evicted while it's alive.
+
+    It also records the hash of the `File` record that a cached file was
+    validated against, so that its freshness can be decided without
+    requests to the cloud.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.db_path = cache_db_path(cache_dir)
+        self._db = get_cache_database(self.db_path)
+        # the size of all recorded files, kept up-to-date by this process
+        self._total_size: Optional[int] = None
+        self._total_size_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._db.connection()
+
+    def _relpath(self, path: Union[Path, UPath]) -> Optional[str]:
+        # only files in the cache directory are managed
+        if isinstance(path, UPath) and not isinstance(path, LocalPathClasses):
+            return None
+        path = Path(path).resolve()
+        cache_dir = self.cache_dir.resolve()
+        if cache_dir not in path.parents or cache_dir / ".lamindb" in path.parents:
+            return None
+        return path.relative_to(cache_dir).as_posix()
+
+    def record_access(self, path: Union[Path, UPath]) -> None:
+        """Record an access and evict files if the cache exceeds its budget."""
+        relpath = self._relpath(path)
+        if relpath is None or not Path(path).is_file():
+            return None
+        size = Path(path).stat().st_size
+        conn = self._connection()
+        with conn:
+            row = conn.execute(
+                "SELECT size FROM entries WHERE path = ?", (relpath,)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (relpath, size, time.time()),
+            )
+        self._add_to_total_size(size - (0 if row is None else row[0]))
+        if settings.cache_max_bytes is not None:
+            self.evict(settings.cache_max_bytes, keep=[relpath])
+
+    def record_validation(self, path: Union[Path, UPath], file: File) -> None:
+        """Record that a cached file has the content of a `File` record."""
+        relpath = self._relpath(path)
+        if relpath is None or file.hash is None:
+            return None
+        try:
+            stat = Path(path).stat()
+        except FileNotFoundError:  # nothing was cached
+            return None
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO validations VALUES (?, ?, ?, ?, ?)",
+                (relpath, file.hash, file.hash_type, stat.st_size, stat.st_mtime_ns),
+            )
+
+    def has_validation(self, path: Union[Path, UPath]) -> bool:
+        """Whether a validation was recorded for a cached file."""
+        relpath = self._relpath(path)
+        if relpath is None:
+            return False
+        row = (
+            self._connection()
+            .execute("SELECT 1 FROM validations WHERE path = ?", (relpath,))
+            .fetchone()
+        )
+        return row is not None
+
+    def is_valid(self, path: Union[Path, UPath], file: File) -> bool:
+        """Whether a cached file still has the content of a `File` record.
+
+        Only compares against the recorded validation, no requests are made.
+        """
+        relpath = self._relpath(path)
+        if relpath is None or file.hash is None:
+            return False
+        row = (
+            self._connection()
+            .execute(
+                "SELECT hash, hash_type, size, mtime_ns FROM validations"
+                " WHERE path = ?",
+                (relpath,),
+            )
+            .fetchone()
+        )
+        if row is None or tuple(row[:2]) != (file.hash, file.hash_type):
+            return False
+        try:
+            stat = Path(path).stat()
+        except FileNotFoundError:
+            return False
+        # the cached file was modified since
+        if (stat.st_size, stat.st_mtime_ns) != tuple(row[2:]):
+            return False
+        return file.size is None or stat.st_size == file.size
+
+    def pin(self, path: Union[Path, UPath]) -> None:
+        """Protect a file from eviction while this process uses it."""
+        relpath = self._relpath(path)
+        if relpath is None:
+            return None
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT INTO pins VALUES (?, ?)", (relpath, os.getpid()))
+
+    def unpin(self, path: Union[Path, UPath]) -> None:
+        relpath = self._relpath(path)
+        if relpath is None:
+            return None
+        conn = self._connection()
+        with conn:
+            # remove a single pin, the file might be pinned several times
+            conn.execute(
+                "DELETE FROM pins WHERE rowid IN (SELECT rowid FROM pins"
+                " WHERE path = ? AND pid = ? LIMIT 1)",
+                (relpath, os.getpid()),
+            )
+
+    def _pinned(self) -> List[str]:
+        conn = self._connection()
+        pins: Dict[int, List[str]] = {}
+        for relpath, pid in conn.execute("SELECT path, pid FROM pins").fetchall():
+            pins.setdefault(pid, []).append(relpath)
+        dead_pids = [(pid,) for pid in pins if not _pid_alive(pid)]
+        with conn:
+            conn.executemany("DELETE FROM pins WHERE pid = ?", dead_pids)
+        return [
+            relpath
+            for pid, relpaths in pins.items()
+            if (pid,) not in dead_pids
+            for relpath in relpaths
+        ]
+
+    def _sum_sizes(self) -> int:
+        row = self._connection().execute("SELECT SUM(size) FROM entries").fetchone()
+        return row[0] or 0
+
+    def _add_to_total_size(self, delta: int) -> None:
+        with self._total_size_lock:
+            if self._total_size is not None:
+                self._total_size += delta
+
+    def total_size(self) -> int:
+        """The size of all recorded files in bytes.
+
+        The sum over all entries is computed once, then it's kept up-to-date
+        with the accesses of this process.
+        """
+        with self._total_size_lock:
+            if self._total_size is None:
+                self._total_size = self._sum_sizes()
+            return self._total_size
+
+    def evict(self, max_bytes: int, keep: Optional[List[str]] = None) -> int:
+        """Evict least recently used files until the cache fits into `max_bytes`.
+
+        Returns the number of freed bytes.
+        """
+        if self.total_size() <= max_bytes:
+            return 0
+        # other processes might have recorded or evicted files in the meantime
+        total_size = self._sum_sizes()
+        with self._total_size_lock:
+            self._total_size = total_size
+        if total_size <= max_bytes:
+            return 0
+        protected = set(self._pinned()) | set(keep or [])
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT path, size FROM entries ORDER BY last_access"
+        ).fetchall()
+        evicted = []
+        freed = 0
+        for relpath, size in rows:
+            if total_size - freed <= max_bytes:
+                break
+            if relpath in protected:
+                continue
+            path = self.cache_dir / relpath
+            try:
+                if path.is_dir():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:  # e.g. opened on Windows
+                continue
+            evicted.append((relpath,))
+            freed += size
+        with conn:
+            conn.executemany("DELETE FROM entries WHERE path = ?", evicted)
+            conn.executemany("DELETE FROM validations WHERE path = ?", evicted)
+        self._add_to_total_size(-freed)
+        return freed
+
+
+_CACHE_MANAGERS: Dict[Path, CacheManager] = {}
+
+
+def get_cache_manager() -> Optional[CacheManager]:
+    """The manager of the cache directory, `None` if no instance is set up."""
+    try:
+        cache_dir = Path(lamindb_setup.settings.storage.cache_dir)
+    except Exception:  # no instance is set up
+        return None
+    if cache_dir not in _CACHE_MANAGERS:
+        _CACHE_MANAGERS[cache_dir] = CacheManager(cache_dir)
+    return _CACHE_MANAGERS[cache_dir]
+
+
+@contextmanager
+def pinned(paths: List[Union[Path, UPath]]) -> Iterator[None]:
+    """Protect cached files from eviction within the context."""
+    cache_manager = get_cache_manager()
+    if cache_manager is None:
+        yield None
+        return None
+    for path in paths:
+        cache_manager.pin(path)
+    try:
+        yield None
+    finally:
+        for path in paths:
+            cache_manager.unpin(path)
+
+
+def _lock_file(f: IO) -> None:
+    if sys.platform == "win32":
+        import msvcrt
+
+        f.seek(0)
+        while True:
+            try:
+                # retries for 10 seconds before raising
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return None
+            except OSError:
+                continue
+    else:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(f: IO) -> None:
+    if sys.platform == "win32":
+        import msvcrt
+
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def cache_lock(local_filepath: Path) -> Iterator[None]:
+    """Lock a path in the cache across threads & processes."""
+    cache_dir = Path(lamindb_setup.settings.storage.cache_dir)
+    name = hashlib.md5(Path(local_filepath).as_posix().encode()).hexdigest()
+    lock_path = cache_dir / ".lamindb" / "locks" / f"{name}.lock"
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        _lock_file(f)
+        try:
+            yield None
+        finally:
+            _unlock_file(f)
+
+
+def _modified_timestamp(filepath: UPath) -> float:
+    if not filepath.is_dir():
+        return filepath.modified.timestamp()  # type: ignore
+    # a directory object, e.g., .zarr, changed when any of its files changed
+    return max(
+        (
+            path.modified.timestamp()  # type: ignore
+            for path in filepath.rglob("*")
+            if path.is_file()
+        ),
+        default=0.0,
+    )
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def synchronize(filepath: UPath, local_filepath: Path, **kwargs) -> bool:
+    """Download a cloud file or directory if the cached copy is missing or outdated.
+
+    The download goes to a temporary path that's renamed, so that readers
+    never see a partially downloaded object. Returns whether it was downloaded.
+    """
+    if not filepath.exists():
+        return False
+    cloud_mts = _modified_timestamp(filepath)
+    if local_filepath.exists() and cloud_mts <= local_filepath.stat().st_mtime:
+        return False
+    local_filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_filepath = local_filepath.with_name(f".{local_filepath.name}.{os.getpid()}.tmp")
+    old_filepath = local_filepath.with_name(f".{local_filepath.name}.{os.getpid()}.old")
+    try:
+        if filepath.is_dir():
+            filepath.download_to(tmp_filepath, recursive=True, **kwargs)
+        else:
+            filepath.download_to(tmp_filepath, **kwargs)
+        os.utime(tmp_filepath, times=(cloud_mts, cloud_mts))
+        # a rename can't replace a directory or a file by a directory, so the
+        # outdated object is moved aside first
+        if local_filepath.is_dir() or (
+            tmp_filepath.is_dir() and local_filepath.exists()
+        ):
+            os.replace(local_filepath, old_filepath)
+        os.replace(tmp_filepath, local_filepath)
+    finally:
+        _remove(tmp_filepath)
+        _remove(old_filepath)
+    return True
+
+
+def _has_content(local_filepath: Path, file: File) -> bool:
+    # records of cloud files have hashes from ETags
+    if file.hash_type in {"md5", "md5-n"}:
+        return matches_etag_hash(local_filepath, file.hash, file.hash_type)
+    return hash_file(local_filepath) == (file.hash, file.hash_type)
+
+
+def is_valid_cache(filepath: UPath, local_filepath: Path, file: File) -> bool:
+    """Whether the cached copy of a cloud file has the content of its `File` record.
+
+    Copies without a recorded validation, cached before validations were
+    recorded or through `load_to_memory`, are validated once: files by
+    comparing their hash, directories by comparing their modification time
+    with the one of the cloud directory.
+    """
+    cache_manager = get_cache_manager()
+    if cache_manager is None:
+        return False
+    if cache_manager.is_valid(local_filepath, file):
+        return True
+    if (
+        file.hash is None
+        or not local_filepath.exists()
+        or cache_manager.has_validation(local_filepath)
+    ):
+        return False
+    if local_filepath.is_dir():
+        if (
+            not filepath.exists()
+            or _modified_timestamp(filepath) > local_filepath.stat().st_mtime
+        ):
+            return False
+    elif not _has_content(local_filepath, file):
+        return False
+    cache_manager.record_validation(local_filepath, file)
+    return True
+
+
+def is_synced(filepath: Union[Path, UPath], file: Optional[File] = None) -> bool:
+    """Whether a file can be accessed without downloading it from the cloud.
+
+    That's the case for files in local storage and for cached files that were
+    validated against the hash of their `File` record.
+    """
+    if not isinstance(filepath, UPath) or isinstance(filepath, LocalPathClasses):
+        return True
+    if file is None:
+        return False
+    local_filepath = lamindb_setup.settings.storage.cloud_to_local_no_update(
+        filepath  # type: ignore
+    )
+    return is_valid_cache(filepath, local_filepath, file)
+
+
+def sync_to_cache(
+    filepath: Union[Path, UPath], file: Optional[File] = None, **kwargs
+) -> Tuple[UPath, bool]:
+    """Like `cloud_to_local`, but also returns whether the file was downloaded."""
+    local_filepath = lamindb_setup.settings.storage.cloud_to_local_no_update(
+        filepath  # type: ignore
+    )
+    cache_manager = get_cache_manager()
+    downloaded = False
+    if not is_synced(filepath, file):
+        with cache_lock(local_filepath):
+            downloaded = synchronize(filepath, local_filepath, **kwargs)  # type: ignore
+        # the cloud file might not exist, then there's nothing to validate
+        if file is not None and cache_manager is not None and local_filepath.exists():
+            cache_manager.record_validation(local_filepath, file)
+    if cache_manager is not None:
+        cache_manager.record_access(local_filepath)
+    return local_filepath, downloaded
+
+
+def cloud_to_local(
+    filepath: Union[Path, UPath], file: Optional[File] = None, **kwargs
+) -> UPath:
+    """Sync a cloud file to the cache and record the access.
+
+    If the `File` record of the path is passed and the cached file was
+    validated against its hash, no requests are made to the cloud.
+
+    Concurrent calls for the same file, also from other processes, download
+    it only once: the first call downloads, the others wait & reuse it.
+    """
+    return sync_to_cache(filepath, file=file, **kwargs)[0]
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Optional
+
+import lamindb_setup
+from lamin_utils import logger
+from lamindb_setup.dev.upath import UPath, print_hook
+
+try:
+    from s3fs import S3FileSystem
+except ImportError:  # pragma: no cover
+    S3FileSystem = None
+
+# s3fs uses the same part size, so that ETags are reproducible
+MULTIPART_CHUNK_SIZE = 50 * 1024 * 1024
+# files below this size are uploaded in one go by s3fs
+MULTIPART_THRESHOLD = 2 * MULTIPART_CHUNK_SIZE
+MAX_PARTS = 10000
+
+
+def supports_multipart(storagepath: UPath) -> bool:
+    return S3FileSystem is not None and isinstance(storagepath.fs, S3FileSystem)
+
+
+def get_chunk_size(size: int) -> int:
+    # S3 allows at most 10000 parts
+    chunk_size = -(-size // MAX_PARTS)
+    chunk_size = -(-chunk_size // (1024 * 1024)) * 1024 * 1024
+    return max(MULTIPART_CHUNK_SIZE, chunk_size)
+
+
+# parts are read into memory before they're uploaded, across all concurrent
+# uploads at most this many parts are held in memory at a time
+MAX_BUFFERED_PARTS = 8
+_part_buffers = threading.BoundedSemaphore(MAX_BUFFERED_PARTS)
+
+LIFECYCLE_HINT = (
+    "parts of uploads that are never resumed can be removed by a lifecycle rule"
+    " of the bucket with AbortIncompleteMultipartUpload"
+)
+
+
+class UploadJournal:
+    """Local record of an unfinished multipart upload.
+
+    It's stored in the cache directory and allows to resume an upload that
+    failed, e.g., because of a dropped connection. There is at most one
+    journal per local file.
+    """
+
+    def __init__(self, localpath: Path, storagepath: UPath):
+        name = hashlib.md5(localpath.resolve().as_posix().encode()).hexdigest()
+        cache_dir = lamindb_setup.settings.storage.cache_dir
+        self.path = Path(cache_dir) / ".lamindb" / "uploads" / f"{name}.json"
+        self.storagepath = storagepath.as_posix()
+        self._lock = threading.Lock()
+        self.record: Dict = {}
+        self.stale: Optional[Dict] = None
+
+    def load(self, stat: os.stat_result, chunk_size: int) -> Optional[str]:
+        """The id of an upload to resume, `None` if there is none.
+
+        If the local file changed since the upload started or is now uploaded
+        to another path, the journal is stale and its record is kept in
+        `stale`, so that its upload can be aborted.
+        """
+        if not self.path.exists():
+            return None
+        record = json.loads(self.path.read_text())
+        if (
+            record["storage_path"],
+            record["size"],
+            record["mtime_ns"],
+            record["chunk_size"],
+        ) != (self.storagepath, stat.st_size, stat.st_mtime_ns, chunk_size):
+            self.stale = record
+            return None
+        self.record = record
+        return record["upload_id"]
+
+    def start(self, upload_id: str, stat: os.stat_result, chunk_size: int) -> None:
+        self.record = {
+            "upload_id": upload_id,
+            "storage_path": self.storagepath,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "chunk_size": chunk_size,
+            "parts": {},
+        }
+        self._write()
+
+    @property
+    def parts(self) -> Dict[str, str]:
+        return self.record["parts"]
+
+    def add_part(self, part_number: int, etag: str) -> None:
+        with self._lock:
+            self.parts[str(part_number)] = etag
+            self._write()
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(self.record))
+        tmp_path.replace(self.path)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def abort_multipart_upload(fs, storage_path: str, upload_id: str) -> None:
+    """Abort a multipart upload, so that S3 deletes its parts."""
+    bucket, key, _ = fs.split_path(storage_path)
+    try:
+        fs.call_s3("abort_multipart_upload", Bucket=bucket, Key=key, UploadId=upload_id)
+    except FileNotFoundError:  # the upload was completed, aborted or expired
+        pass
+    except Exception as exception:
+        logger.warning(
+            f"could not abort multipart upload of {key}: {exception}, {LIFECYCLE_HINT}"
+        )
+
+
+def upload_multipart(
+    localpath: Path,
+    storagepath: UPath,
+    max_workers: int = 8,
+    print_progress: bool = True,
+) -> None:
+    """Upload a large file to S3 in parts that are transferred in parallel.
+
+    Completed parts are recorded in an :class:`UploadJournal`. If the upload
+    fails, calling this again uploads only the missing parts. An upload is
+    only aborted if it's interrupted with `KeyboardInterrupt` or if its
+    journal is stale.
+    """
+    fs = storagepath.fs
+    bucket, key, _ = fs.split_path(storagepath.as_posix())
+    stat = localpath.stat()
+    size = stat.st_size
+    chunk_size = get_chunk_size(size)
+    n_parts = -(-size // chunk_size)
+
+    journal = UploadJournal(localpath, storagepath)
+    upload_id = journal.load(stat, chunk_size)
+    if journal.stale is not None:
+        # the upload of an outdated file or to a path that's no longer used
+        abort_multipart_upload(
+            fs, journal.stale["storage_path"], journal.stale["upload_id"]
+        )
+    if upload_id is not None:
+        try:
+            fs.call_s3("list_parts", Bucket=bucket, Key=key, UploadId=upload_id)
+        except FileNotFoundError:  # the upload was aborted or expired
+            upload_id = None
+    if upload_id is None:
+        response = fs.call_s3("create_multipart_upload", Bucket=bucket, Key=key)
+        upload_id = response["UploadId"]
+        journal.start(upload_id, stat, chunk_size)
+
+    uploaded = [chunk_size * len(journal.parts)]
+    progress_lock = threading.Lock()
+
+    def upload_part(part_number: int) -> None:
+        with _part_buffers:
+            with open(localpath, "rb") as f:
+                f.seek((part_number - 1) * chunk_size)
+                data = f.read(chunk_size)
+            response = fs.call_s3(
+                "upload_part",
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data,
+            )
+        journal.add_part(part_number, response["ETag"])
+        if print_progress:
+            with progress_lock:
+                uploaded[0] += len(data)
+                print_hook(
+                    size=size,
+                    value=min(uploaded[0], size),
+                    filepath=localpath.name,
+                    action="uploading",
+                )
+
+    missing_parts = [
+        part_number
+        for part_number in range(1, n_parts + 1)
+        if str(part_number) not in journal.parts
+    ]
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(upload_part, part_number)
+                for part_number in missing_parts
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                # don't start uploading further parts
+                for future in futures:
+                    future.cancel()
+                raise
+        parts = [
+            {"PartNumber": part_number, "ETag": journal.parts[str(part_number)]}
+            for part_number in range(1, n_parts + 1)
+        ]
+        fs.call_s3(
+            "complete_multipart_upload",
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except KeyboardInterrupt:
+        # the upload was cancelled
+        abort_multipart_upload(fs, storagepath.as_posix(), upload_id)
+        journal.remove()
+        raise
+    except Exception:
+        # the completed parts are kept in S3 and in the journal
+        logger.warning(
+            f"multipart upload of {key} failed, saving again resumes it, "
+            + LIFECYCLE_HINT
+        )
+        raise
+    journal.remove()
+    fs.invalidate_cache(storagepath.as_posix())
@@ -1,28 +1,100 @@
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
 from typing import Optional
 
+import numpy as np
 import scipy.sparse as sparse
 import zarr
 from anndata import AnnData
 from anndata._io import read_zarr
 from anndata._io.specs import write_elem
 from lamindb_setup.dev.upath import infer_filesystem
+from numcodecs import Blosc
+
+from lamindb.dev._settings import ZarrWritePolicy, settings
 
 from ._anndata_sizes import _size_elem, _size_raw, size_adata
 
 
+def open_zarr_group(store) -> zarr.Group:
+    # consolidated metadata is read in one request instead of one per element
+    try:
+        return zarr.open_consolidated(store, mode="r")
+    except KeyError:
+        return zarr.open(store, mode="r")
+
+
+def _get_compressor(policy: ZarrWritePolicy) -> Optional[Blosc]:
+    if policy.compressor is None:
+        return None
+    return Blosc(cname=policy.compressor, clevel=policy.clevel, shuffle=Blosc.SHUFFLE)
+
+
+def _n_rows_per_chunk(policy: ZarrWritePolicy, n_rows: int, row_nbytes: float) -> int:
+    n_rows_chunk = int(policy.chunk_bytes // max(row_nbytes, 1))
+    return min(max(n_rows_chunk, 1), max(n_rows, 1))
+
+
+def _write_matrix(
+    group: zarr.Group, key: str, mat, policy: ZarrWritePolicy, dataset_kwargs
+):
+    """Write X or a layer with chunks that fit random access along rows."""
+    compressor = _get_compressor(policy)
+    if isinstance(mat, np.ndarray) and mat.ndim == 2:
+        row_nbytes = mat.shape[1] * mat.itemsize
+        chunks = (_n_rows_per_chunk(policy, mat.shape[0], row_nbytes), mat.shape[1])
+        kwargs = dict(chunks=chunks, compressor=compressor)
+        write_elem(group, key, mat, dataset_kwargs={**kwargs, **dataset_kwargs})
+    elif isinstance(mat, (sparse.csr_matrix, sparse.csc_matrix)):
+        fmt = "csr" if isinstance(mat, sparse.csr_matrix) else "csc"
+        n_major = len(mat.indptr) - 1
+        nnz_nbytes = mat.data.itemsize + mat.indices.itemsize
+        row_nbytes = mat.nnz * nnz_nbytes / max(n_major, 1)
+        n_rows_chunk = _n_rows_per_chunk(policy, n_major, row_nbytes)
+        # data & indices chunks span about as many rows as the indptr chunks
+        nnz_chunk = max(int(n_rows_chunk * row_nbytes / nnz_nbytes), 1)
+        sparse_group = group.create_group(key)
+        sparse_group.attrs["encoding-type"] = f"{fmt}_matrix"
+        sparse_group.attrs["encoding-version"] = "0.1.0"
+        sparse_group.attrs["shape"] = list(mat.shape)
+        for name, chunk_len in (
+            ("data", nnz_chunk),
+            ("indices", nnz_chunk),
+            ("indptr", n_rows_chunk + 1),
+        ):
+            kwargs = dict(chunks=(chunk_len,), compressor=compressor)
+            sparse_group.create_dataset(
+                name, data=getattr(mat, name), **{**kwargs, **dataset_kwargs}
+            )
+    else:
+        kwargs = dict(compressor=compressor)
+        write_elem(group, key, mat, dataset_kwargs={**kwargs, **dataset_kwargs})
+
+
 def read_adata_zarr(storepath) -> AnnData:
     fs, storepath = infer_filesystem(storepath)
 
     store = fs.get_mapper(storepath, check=True)
-    adata = read_zarr(store)
+    adata = read_zarr(open_zarr_group(store))
 
     return adata
 
 
 def write_adata_zarr(
-    adata: AnnData, storepath, callback=None, chunks=None, **dataset_kwargs
+    adata: AnnData,
+    storepath,
+    callback=None,
+    chunks=None,
+    consolidate: bool = True,
+    policy: Optional[ZarrWritePolicy] = None,
+    max_workers: int = 4,
+    **dataset_kwargs,
 ):
+    if policy is None:
+        policy = settings.zarr_write_policy
+
     fs, storepath = infer_filesystem(storepath)
 
     store = fs.get_mapper(storepath, create=True)
@@ -37,6 +109,7 @@ def write_adata_zarr(
 
     adata_size = None
     cumulative_val = 0
+    cb_lock = Lock()
 
     def _cb(key_write: Optional[str] = None):
         nonlocal adata_size
@@ -62,26 +135,62 @@ def write_adata_zarr(
         cumulative_val += elem_size
         callback(adata_size, cumulative_val)
 
-    def _write_elem_cb(f, k, elem, dataset_kwargs):
-        write_elem(f, k, elem, dataset_kwargs=dataset_kwargs)
-        _cb(k)
+    # for all elements other than X and layers, only apply the compressor
+    # 1-d arrays of dataframe columns are chunked along rows
+    # the values passed by the caller override these defaults
+    compressor_kwargs = {"compressor": _get_compressor(policy), **dataset_kwargs}
+    n_obs_chunk = _n_rows_per_chunk(policy, adata.n_obs, 8)
+    column_kwargs = {"chunks": (n_obs_chunk,), **compressor_kwargs}
+
+    def _write_X():
+        if chunks is not None and not isinstance(adata.X, sparse.spmatrix):
+            _write_matrix(f, "X", adata.X, policy, {"chunks": chunks, **dataset_kwargs})
+        else:
+            _write_matrix(f, "X", adata.X, policy, dataset_kwargs)
+
+    def _write_layers():
+        layers_group = f.create_group("layers")
+        layers_group.attrs["encoding-type"] = "dict"
+        layers_group.attrs["encoding-version"] = "0.1.0"
+        for key, layer in adata.layers.items():
+            _write_matrix(layers_group, key, layer, policy, dataset_kwargs)
+
+    writers = {
+        "X": _write_X,
+        "obs": partial(write_elem, f, "obs", adata.obs, dataset_kwargs=column_kwargs),
+        "var": partial(
+            write_elem, f, "var", adata.var, dataset_kwargs=compressor_kwargs
+        ),
+        "layers": _write_layers,
+    }
+    for elem in ("obsm", "varm", "obsp", "varp", "uns"):
+        writers[elem] = partial(
+            write_elem,
+            f,
+            elem,
+            dict(getattr(adata, elem)),
+            dataset_kwargs=compressor_kwargs,
+        )
+    writers["raw"] = partial(
+        write_elem, f, "raw", adata.raw, dataset_kwargs=compressor_kwargs
+    )
+
+    def _write_elem_cb(key_write: str):
+        writers[key_write]()
+        with cb_lock:
+            _cb(key_write)
 
     _cb(None)
     with warnings.catch_warnings():
         warnings.filterwarnings("ignore", category=UserWarning, module="zarr")
-
-        if chunks is not None and not isinstance(adata.X, sparse.spmatrix):
-            _write_elem_cb(
-                f, "X", adata.X, dataset_kwargs=dict(chunks=chunks, **dataset_kwargs)
-            )
-        else:
-            _write_elem_cb(f, "X", adata.X, dataset_kwargs=dataset_kwargs)
-        for elem in ("obs", "var"):
-            _write_elem_cb(f, elem, getattr(adata, elem), dataset_kwargs=dataset_kwargs)
-        for elem in ("obsm", "varm", "obsp", "varp", "layers", "uns"):
-            _write_elem_cb(
-                f, elem, dict(getattr(adata, elem)), dataset_kwargs=dataset_kwargs
-            )
-        _write_elem_cb(f, "raw", adata.raw, dataset_kwargs=dataset_kwargs)
+        # elements are written to separate keys and hence independent
+        # the chunks of a single array are uploaded concurrently by zarr
+        # for async filesystems like s3 and gcs
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_write_elem_cb, key) for key in writers]
+            for future in futures:
+                future.result()
+    if consolidate:
+        zarr.consolidate_metadata(store)
     # todo: fix size less than total at the end
     _cb(None)
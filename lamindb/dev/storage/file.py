@@ -1,4 +1,6 @@
+import os
 import shutil
+import sys
 from pathlib import Path
 from typing import Union
 
@@ -15,6 +17,10 @@ from lamindb_setup.dev.upath import (
 )
 from lnschema_core.models import File, Storage
 
+from ._arrow import is_pushdown, read_parquet
+from ._cache import cloud_to_local
+from ._multipart import MULTIPART_THRESHOLD, supports_multipart, upload_multipart
+
 try:
     from ._zarr import read_adata_zarr
 except ImportError:
@@ -75,7 +81,61 @@ def read_adata_h5ad(filepath, **kwargs) -> ad.AnnData:
         return adata
 
 
-def store_object(localpath: Union[str, Path, UPath], storagekey: str) -> float:
+# ioctl request to clone a file on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if sys.platform == "darwin":
+        import ctypes
+
+        libc = ctypes.CDLL("libc.dylib", use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+    elif sys.platform.startswith("linux"):
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                fdst.close()
+                os.unlink(dst)
+                raise
+    else:
+        raise OSError("reflinks aren't supported on this platform")
+
+
+def clone_or_copy(src: Union[str, Path], dst: Union[str, Path]) -> str:
+    """Populate `dst` with the content of `src` without copying if possible.
+
+    Tries a reflink (copy-on-write clone) and falls back to a copy. Returns
+    `"reflink"` or `"copy"`.
+
+    Hardlinks aren't used, as they'd share their content with `src`, which
+    the user might still edit.
+    """
+    src, dst = Path(src), Path(dst)
+    # populate a temporary path to replace an existing dst atomically
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    try:
+        try:
+            _reflink(src, tmp)
+            method = "reflink"
+        except OSError:
+            shutil.copyfile(src, tmp)
+            method = "copy"
+        os.replace(tmp, dst)
+        return method
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def store_object(
+    localpath: Union[str, Path, UPath], storagekey: str, print_progress: bool = True
+) -> float:
     """Store arbitrary file to configured storage location.
 
     Returns size in bytes.
@@ -89,18 +149,26 @@ def store_object(localpath: Union[str, Path, UPath], storagekey: str) -> float:
         size = sum(f.stat().st_size for f in localpath.rglob("*") if f.is_file())
 
     if not isinstance(storagepath, LocalPathClasses):
-        storagepath.upload_from(localpath, recursive=True, print_progress=True)
+        if (
+            localpath.is_file()
+            and size >= MULTIPART_THRESHOLD
+            and supports_multipart(storagepath)
+        ):
+            # resumes a previously interrupted upload
+            upload_multipart(localpath, storagepath, print_progress=print_progress)
+        else:
+            storagepath.upload_from(
+                localpath, recursive=True, print_progress=print_progress
+            )
     else:  # storage path is local
         storagepath.parent.mkdir(parents=True, exist_ok=True)
         if localpath.is_file():
-            try:
-                shutil.copyfile(localpath, storagepath)
-            except shutil.SameFileError:
-                pass
+            if not (storagepath.exists() and storagepath.samefile(localpath)):
+                clone_or_copy(localpath, storagepath)
         else:
             if storagepath.exists():
                 shutil.rmtree(storagepath)
-            shutil.copytree(localpath, storagepath)
+            shutil.copytree(localpath, storagepath, copy_function=clone_or_copy)
     return float(size)  # because this is how we store in the db
 
 
@@ -133,9 +201,50 @@ def read_fcs(*args, **kwargs):
     return readfcs.read(*args, **kwargs)
 
 
-def read_tsv(path: Union[str, Path, UPath]) -> pd.DataFrame:
+# options of pd.read_csv that its pyarrow engine doesn't support
+PYARROW_UNSUPPORTED_OPTIONS = {
+    "chunksize",
+    "comment",
+    "converters",
+    "dayfirst",
+    "delim_whitespace",
+    "dialect",
+    "float_precision",
+    "iterator",
+    "lineterminator",
+    "low_memory",
+    "memory_map",
+    "nrows",
+    "on_bad_lines",
+    "quoting",
+    "skipfooter",
+    "skipinitialspace",
+    "thousands",
+    "verbose",
+}
+
+
+def read_csv(path: Union[str, Path, UPath], **kwargs) -> pd.DataFrame:
+    """Read a csv file with `pd.read_csv`.
+
+    Pass `engine="pyarrow"` to parse with multiple threads. Note that it infers
+    some dtypes differently, e.g., it parses dates. If other options aren't
+    supported by the pyarrow engine, the default engine is used.
+    """
     path_sanitized = Path(path)
-    return pd.read_csv(path_sanitized, sep="\t")
+    if kwargs.get("engine") == "pyarrow":
+        unsupported = PYARROW_UNSUPPORTED_OPTIONS.intersection(kwargs)
+        if len(unsupported) > 0:
+            logger.warning(
+                "the pyarrow engine doesn't support"
+                f" {', '.join(sorted(unsupported))}, using the default engine"
+            )
+            kwargs.pop("engine")
+    return pd.read_csv(path_sanitized, **kwargs)
+
+
+def read_tsv(path: Union[str, Path, UPath], **kwargs) -> pd.DataFrame:
+    return read_csv(path, sep="\t", **kwargs)
 
 
 def load_to_memory(filepath: Union[str, Path, UPath], stream: bool = False, **kwargs):
@@ -147,21 +256,22 @@ def load_to_memory(filepath: Union[str, Path, UPath], stream: bool = False, **kw
 
     if filepath.suffix in (".zarr", ".zrad"):
         stream = True
+    elif filepath.suffix == ".parquet":
+        # only the selected columns & row groups are read from storage
+        stream = is_pushdown(kwargs)
     elif filepath.suffix != ".h5ad":
         stream = False
 
     if not stream:
         # caching happens here if filename is a UPath
         # todo: make it safe when filepath is just Path
-        filepath = settings.instance.storage.cloud_to_local(
-            filepath, print_progress=True
-        )
+        filepath = cloud_to_local(filepath, print_progress=True)
 
     READER_FUNCS = {
-        ".csv": pd.read_csv,
+        ".csv": read_csv,
         ".tsv": read_tsv,
         ".h5ad": read_adata_h5ad,
-        ".parquet": pd.read_parquet,
+        ".parquet": read_parquet,
         ".fcs": read_fcs,
         ".zarr": read_adata_zarr,
         ".zrad": read_adata_zarr,
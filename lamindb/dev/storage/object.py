@@ -1,10 +1,12 @@
 from pathlib import Path
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 
 from anndata import AnnData
 from lamindb_setup.dev.upath import UPath
 from pandas import DataFrame
 
+from lamindb.dev.hashing import HashingWriter
+
 
 def infer_suffix(dmem, adata_format: Optional[str] = None):
     """Infer LaminDB storage file suffix from a data object."""
@@ -25,10 +27,18 @@ def infer_suffix(dmem, adata_format: Optional[str] = None):
         raise NotImplementedError
 
 
-def write_to_file(dmem, filepath: Union[str, Path, UPath]):
+def write_to_file(dmem, filepath: Union[str, Path, UPath]) -> Optional[Tuple[str, str]]:
+    """Write a data object to a file.
+
+    Returns the hash and hash type if they could be computed while writing.
+    """
     if isinstance(dmem, AnnData):
+        # h5py writes out of order, the hash is computed from the file
         dmem.write(filepath)
     elif isinstance(dmem, DataFrame):
-        dmem.to_parquet(filepath)
+        with HashingWriter(filepath) as writer:
+            dmem.to_parquet(writer)
+        return writer.hash_and_type()
     else:
         raise NotImplementedError
+    return None
@@ -2,15 +2,18 @@ from inspect import signature
 from pathlib import Path
 
 import anndata as ad
+import h5py
 import lnschema_bionty as lb
 import numpy as np
 import pandas as pd
+import pyarrow.dataset as ds
 import pytest
 from django.db.models.deletion import ProtectedError
 from scipy.sparse import csr_matrix
 
 import lamindb as ln
 from lamindb import _dataset
+from lamindb.dev.storage._backed_access import AnnDataAccessor, BackedAccessor
 
 df = pd.DataFrame({"feat1": [1, 2], "feat2": [3, 4]})
 
@@ -250,14 +253,102 @@ def test_from_consistent_files():
     adata_joined = dataset.load()
     assert "file_uid" in adata_joined.obs.columns
     assert file1.uid in adata_joined.obs.file_uid.cat.categories
-    with pytest.raises(RuntimeError) as error:
+    paths = dataset.stage()
+    assert {path.name for path in paths} == {file1.path.name, file2.path.name}
+    assert all(path.exists() for path in paths)
+    paths = ln.File.filter(id__in=[file1.id, file2.id]).order_by("id").stage()
+    assert len(paths) == 2
+    with pytest.raises(TypeError):
+        ln.Transform.filter().stage()
+    with dataset.backed() as access:
+        assert isinstance(access, ln.dev.storage.AnnDataConcatAccessor)
+        assert access.shape == (4, 3)
+        assert set(access.read_obs(columns=["feat1"]).file_uid) == {
+            file1.uid,
+            file2.uid,
+        }
+        adata_subset = access[[3, 0], ["GATA1", "MYC"]].to_memory()
+        assert adata_subset.shape == (2, 2)
+        assert adata_subset.var_names.tolist() == ["GATA1", "MYC"]
+        assert adata_subset.obs_names.tolist() == [
+            access.obs_names[3],
+            access.obs_names[0],
+        ]
+    assert access.closed
+    file1.delete(permanent=True, storage=True)
+    file2.delete(permanent=True, storage=True)
+    dataset.delete(permanent=True)
+
+
+def test_backed_mixed_files(monkeypatch):
+    with h5py.File("test_backed_mixed.h5", mode="w") as f:
+        f.create_dataset("x", data=np.arange(3))
+    file1 = ln.File(adata, description="Part one")
+    file1.save()
+    file2 = ln.File("test_backed_mixed.h5", description="Part two")
+    file2.save()
+    file3 = ln.File(df, description="Part three")
+    file3.save()
+    opened, closed = [], []
+    backed = ln.File.backed
+
+    def record_backed(self, *args, **kwargs):
+        opened.append(backed(self, *args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(ln.File, "backed", record_backed)
+    for accessor_class in (AnnDataAccessor, BackedAccessor):
+        close = accessor_class.close
+
+        def record_close(self, close=close):
+            closed.append(self)
+            close(self)
+
+        monkeypatch.setattr(accessor_class, "close", record_close)
+    dataset = ln.Dataset([file1, file2], name="Mixed files")
+    dataset.save()
+    with pytest.raises(RuntimeError):
         dataset.backed()
-    assert str(error.exconly()).startswith(
-        "RuntimeError: Can only call backed() for datasets with a single file"
-    )
+    # the accessors that were opened before the error are closed
+    assert any(isinstance(accessor, BackedAccessor) for accessor in opened)
+    assert all(any(accessor is other for other in closed) for accessor in opened)
+    opened.clear()
+    closed.clear()
+    dataset2 = ln.Dataset([file1, file3], name="Unsupported file")
+    dataset2.save()
+    with pytest.raises(ValueError):
+        dataset2.backed()
+    assert all(any(accessor is other for other in closed) for accessor in opened)
+    dataset.delete(permanent=True)
+    dataset2.delete(permanent=True)
     file1.delete(permanent=True, storage=True)
     file2.delete(permanent=True, storage=True)
+    file3.delete(permanent=True, storage=True)
+    Path("test_backed_mixed.h5").unlink()
+
+
+def test_load_parquet_files():
+    df1 = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    df2 = pd.DataFrame({"a": [3], "c": [1.5]})
+    file1 = ln.File(df1, description="Part one")
+    file1.save()
+    file2 = ln.File(df2, description="Part two")
+    file2.save()
+    dataset = ln.Dataset([file1, file2], name="Parquet shards")
+    dataset.save()
+    df = dataset.load()
+    assert df.shape == (3, 3)
+    assert sorted(df.a.tolist()) == [1, 2, 3]
+    # same as concatenating the files with pandas
+    pd.testing.assert_frame_equal(df, pd.concat([df1, df2]))
+    assert dataset.load(columns=["a"]).columns.tolist() == ["a"]
+    assert dataset.load(join="inner").columns.tolist() == ["a"]
+    scanner = dataset.scan(columns=["a"], filter=[("a", ">", 1)])
+    assert sorted(scanner.to_table().column("a").to_pylist()) == [2, 3]
+    assert dataset.scan(filter=ds.field("c") > 1).count_rows() == 1
     dataset.delete(permanent=True)
+    file1.delete(permanent=True, storage=True)
+    file2.delete(permanent=True, storage=True)
 
 
 def test_dataset_mapped():
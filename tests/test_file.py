@@ -8,7 +8,9 @@ import lnschema_bionty as lb
 import numpy as np
 import pandas as pd
 import pytest
+from django.db import connection
 from django.db.models.deletion import ProtectedError
+from django.test.utils import CaptureQueriesContext
 from lamindb_setup.dev.upath import (
     CloudPath,
     LocalPathClasses,
@@ -19,17 +21,23 @@ from lamindb_setup.dev.upath import (
 import lamindb as ln
 from lamindb import _file
 from lamindb._file import (
+    check_path_in_existing_storage,
     check_path_is_child_of_root,
+    get_existing_files,
     get_hash,
     get_relative_path_to_directory,
+    hash_filepaths,
     process_data,
 )
+from lamindb.dev.hashing import hash_file, hash_md5s3
+from lamindb.dev.storage._arrow import iter_batches
 from lamindb.dev.storage._zarr import write_adata_zarr
 from lamindb.dev.storage.file import (
     AUTO_KEY_PREFIX,
     auto_storage_key_from_id_suffix,
     delete_storage,
     load_to_memory,
+    read_csv,
     read_fcs,
     read_tsv,
 )
@@ -428,6 +436,24 @@ def test_from_dir(get_test_filepaths, key):
         file.delete(permanent=True, storage=False)
 
 
+def test_from_paths(get_test_filepaths):
+    test_dirpath = get_test_filepaths[2]
+    paths = sorted(test_dirpath.glob("my_file*"))
+    with pytest.raises(ValueError):
+        ln.File.from_paths(paths, keys=["only_one_key"])
+    files = ln.File.from_paths(paths, description="from paths")
+    assert len(files) == 3
+    for file, path in zip(files, paths):
+        assert file.hash == ln.dev.hashing.hash_file(path)[0]
+        assert file.description == "from paths"
+    # existing files are looked up in bulk
+    files[2].save()
+    files_again = ln.File.from_paths(paths)
+    assert files_again[2] == files[2]
+    assert files_again[0]._state.adding
+    files[2].delete(permanent=True, storage=True)
+
+
 def test_delete(get_test_filepaths):
     test_filepath = get_test_filepaths[3]
     file = ln.File(test_filepath, description="My test file to delete")
@@ -580,6 +606,17 @@ def test_check_path_is_child_of_root():
     assert not check_path_is_child_of_root(path)
 
 
+def test_check_path_in_existing_storage():
+    root = Path("./storage_root_index").resolve()
+    storage = ln.Storage(root=root.as_posix(), type="local")
+    storage.save()
+    assert check_path_in_existing_storage(root / "my_dir/my_file.txt") == storage
+    assert not check_path_in_existing_storage(root.parent / "my_file.txt")
+    # the index is rebuilt after deleting a storage location
+    storage.delete()
+    assert not check_path_in_existing_storage(root / "my_dir/my_file.txt")
+
+
 def test_serialize_paths():
     fp_str = ln.dev.datasets.anndata_file_pbmc68k_test().as_posix()
     fp_path = Path(fp_str)
@@ -587,20 +624,20 @@ def test_serialize_paths():
     up_str = "s3://lamindb-ci/test-data/test.csv"
     up_upath = UPath(up_str)
 
-    _, filepath, _, _, _ = process_data(
+    _, filepath, _, _, _, _ = process_data(
         "id", fp_str, None, None, skip_existence_check=True
     )
     assert isinstance(filepath, LocalPathClasses)
-    _, filepath, _, _, _ = process_data(
+    _, filepath, _, _, _, _ = process_data(
         "id", fp_path, None, None, skip_existence_check=True
     )
     assert isinstance(filepath, LocalPathClasses)
 
-    _, filepath, _, _, _ = process_data(
+    _, filepath, _, _, _, _ = process_data(
         "id", up_str, None, None, skip_existence_check=True
     )
     assert isinstance(filepath, CloudPath)
-    _, filepath, _, _, _ = process_data(
+    _, filepath, _, _, _, _ = process_data(
         "id", up_upath, None, None, skip_existence_check=True
     )
     assert isinstance(filepath, CloudPath)
@@ -622,9 +659,19 @@ def test_load_to_memory():
     pd.DataFrame([1, 2]).to_csv("test.zip", sep="\t")
     load_to_memory("test.zip")
     assert get_hash("test.zip", suffix=".zip", check_hash=False)[0] is None
+    # parquet with column & row group pushdown
+    pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}).to_parquet(
+        "test.parquet", row_group_size=1
+    )
+    df = load_to_memory("test.parquet", columns=["b"], filters=[("a", ">", 1)])
+    assert df.b.tolist() == ["y", "z"]
+    # other arguments are passed to pd.read_parquet
+    df = load_to_memory("test.parquet", columns=["a"], engine="pyarrow")
+    assert df.columns.tolist() == ["a"]
     UPath("test.tsv").unlink()
     UPath("test.zrad").unlink()
     UPath("test.zip").unlink()
+    UPath("test.parquet").unlink()
 
     with pytest.raises(NotImplementedError) as error:
         ln.File(True)
@@ -635,6 +682,135 @@ def test_load_to_memory():
     )
 
 
+def test_iter_batches():
+    df = pd.DataFrame({"a": range(5), "b": list("abcde")})
+    df.to_csv("test_iter_batches.csv", index=False)
+    file = ln.File("test_iter_batches.csv", description="test")
+    file.save()
+    assert file.load().equals(df)
+    batches = list(file.iter_batches(batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert pd.concat(batches).equals(df)
+    assert list(file.iter_batches(columns=["b"]))[0].columns.tolist() == ["b"]
+    file.delete(permanent=True, storage=True)
+    UPath("test_iter_batches.csv").unlink()
+
+
+def test_stored_file_is_independent_of_source():
+    filepath = Path("test_edit_after_save.txt")
+    filepath.write_text("original")
+    file = ln.File(filepath, description="test edit after save")
+    file.save()
+    assert not file.path.samefile(filepath)
+    filepath.write_text("edited content")
+    assert hash_file(file.path)[0] == file.hash
+    file.delete(permanent=True, storage=True)
+    filepath.unlink()
+
+
+def test_hash_filepaths_cloud():
+    filepaths = [
+        UPath("s3://lamindb-ci/test-data/test_hash_filepaths_1.csv"),
+        UPath("s3://lamindb-ci/test-data/test_hash_filepaths_2.csv"),
+    ]
+    # the ETags of a listing, no requests are made
+    stats = [
+        {"ETag": '"9b89c8c1acf79dba5b5341d1fff9806f"'},
+        {"ETag": '"9b89c8c1acf79dba5b5341d1fff9806f-3"'},
+    ]
+    hashes_and_types = hash_filepaths(filepaths, stats)
+    assert hashes_and_types == [
+        ("m4nIwaz3nbpbU0HR__mAbw", "md5"),
+        ("m4nIwaz3nbpbU0HR__mAbw-3", "md5-n"),
+    ]
+    # the hashes of cloud files are looked up in a single query
+    with CaptureQueriesContext(connection) as context:
+        existing_files = get_existing_files(filepaths, hashes_and_types)
+    assert len(context) == 1
+    assert existing_files == {hash: [] for hash, _ in hashes_and_types}
+
+
+def test_create_single_file_queries():
+    filepath = Path("test_create_single_file_queries.txt")
+    filepath.write_text("content without a duplicate")
+    with CaptureQueriesContext(connection) as context:
+        ln.File(filepath, description="test queries")
+    # the duplicate check by hash and by size for ETag hashes is one query
+    queries = [
+        query["sql"] for query in context if "lnschema_core_file" in query["sql"]
+    ]
+    assert len(queries) == 1
+    filepath.unlink()
+
+
+def test_create_single_file_etag_duplicate():
+    filepath = Path("test_create_single_file_etag_duplicate.txt")
+    filepath.write_bytes(b"0" * 3 * 1024 * 1024)
+    file = ln.File(filepath, description="test etag duplicate")
+    file.save()
+    # the record of a multipart upload has a hash from the ETag
+    file.hash, file.hash_type = hash_md5s3(filepath, chunk_size=1024 * 1024)
+    file.save()
+    assert file.hash.endswith("-3")
+    with CaptureQueriesContext(connection) as context:
+        assert ln.File(filepath, description="test etag duplicate") == file
+    queries = [
+        query["sql"] for query in context if "lnschema_core_file" in query["sql"]
+    ]
+    assert len(queries) == 1
+    file.delete(permanent=True, storage=True)
+    filepath.unlink()
+
+
+def test_iter_batches_type_change():
+    # types are inferred from the first block of 1 MB, the rest isn't an int
+    lines = ["a,b"] + [f"{i},{i}" for i in range(300000)] + ["x,300000"]
+    Path("test_type_change.csv").write_text("\n".join(lines) + "\n")
+    batches = list(iter_batches(UPath("test_type_change.csv"), batch_size=100000))
+    df = pd.concat(batches)
+    assert df.shape == (300001, 2)
+    assert df.index.equals(pd.RangeIndex(300001))
+    assert df.b.tolist()[-1] == 300000
+    UPath("test_type_change.csv").unlink()
+
+
+def test_read_csv():
+    Path("test_read_csv.csv").write_text(",a,a\n0,1,2\n1,3,4\n")
+    df = read_csv("test_read_csv.csv")
+    assert df.columns.tolist() == ["Unnamed: 0", "a", "a.1"]
+    assert [
+        batch.columns.tolist()
+        for batch in iter_batches(UPath("test_read_csv.csv"), batch_size=1)
+    ] == [["Unnamed: 0", "a", "a.1"]] * 2
+    # options of the caller are respected
+    assert read_csv("test_read_csv.csv", engine="python").shape == (2, 3)
+    assert read_csv("test_read_csv.csv", skiprows=lambda i: i == 1).shape == (1, 3)
+    with read_csv("test_read_csv.csv", chunksize=1) as reader:
+        assert len(list(reader)) == 2
+    # the pyarrow engine is opt-in, unsupported options use the default engine
+    Path("test_read_csv.csv").write_text("a,b\n0,1\n1,3\n")
+    assert read_csv("test_read_csv.csv", engine="pyarrow").shape == (2, 2)
+    assert read_csv("test_read_csv.csv", engine="pyarrow", nrows=1).shape == (1, 2)
+    UPath("test_read_csv.csv").unlink()
+
+
+def test_read_csv_dtypes():
+    Path("test_read_csv_dtypes.csv").write_text(
+        "date,time,flag,count,name,empty\n"
+        "2023-01-01,2023-01-01 10:00,True,1,x,\n"
+        "2023-01-02,2023-01-02 11:00,False,,,\n"
+    )
+    # the same dtypes as pd.read_csv, e.g., dates aren't parsed
+    expected = pd.read_csv("test_read_csv_dtypes.csv")
+    df = read_csv("test_read_csv_dtypes.csv")
+    assert df.equals(expected)
+    assert (df.dtypes == expected.dtypes).all()
+    assert isinstance(df.date[0], str)
+    batches = iter_batches(UPath("test_read_csv_dtypes.csv"), batch_size=2)
+    assert pd.concat(batches).equals(expected)
+    UPath("test_read_csv_dtypes.csv").unlink()
+
+
 def test_delete_storage():
     with pytest.raises(FileNotFoundError):
         delete_storage(UPath("test"))
@@ -1,7 +1,25 @@
 import base64
+import hashlib
+import os
+import shutil
+import time
 from pathlib import Path
 
-from lamindb.dev.hashing import b16_to_b64, hash_file, to_b64_str
+import fsspec
+from fsspec.implementations.memory import MemoryFileSystem
+from lamindb_setup.dev.upath import UPath
+
+from lamindb.dev._hash_cache import HashCache
+from lamindb.dev.hashing import (
+    HashingWriter,
+    b16_to_b64,
+    hash_dir,
+    hash_file,
+    hash_files,
+    hash_md5s3,
+    matches_etag_hash,
+    to_b64_str,
+)
 
 
 def test_compute_hash():
@@ -24,6 +42,90 @@ def test_compute_hash():
         filepath.unlink()
 
 
+def test_hash_files():
+    filepaths = [Path(f"file_{i}.txt") for i in range(10)]
+    for i, filepath in enumerate(filepaths):
+        filepath.write_text("abc" * i)
+    hashes = hash_files(filepaths, chunk_size=2, max_workers=4)
+    assert hashes == [hash_file(filepath, chunk_size=2) for filepath in filepaths]
+    for filepath in filepaths:
+        filepath.unlink()
+
+
+def test_hash_cache():
+    cache = HashCache(Path("hash_cache_test/hash_cache.sqlite"))
+    filepath = Path("file_cached.txt")
+    filepath.write_text("abc")
+    path = os.path.realpath(filepath)
+    # recently modified files aren't cached
+    cache.set(path, os.stat(path), 10, ("hash", "md5"))
+    assert cache.get(path, os.stat(path), 10) is None
+    mtime = time.time() - 10
+    os.utime(path, (mtime, mtime))
+    cache.set(path, os.stat(path), 10, ("hash", "md5"))
+    assert cache.get(path, os.stat(path), 10) == ("hash", "md5")
+    assert cache.get(path, os.stat(path), None) is None
+    # new entries are written to disk in batches
+    other = HashCache(cache.db_path)
+    assert other.get(path, os.stat(path), 10) is None
+    cache.flush()
+    assert other.get(path, os.stat(path), 10) == ("hash", "md5")
+    # a modified file invalidates the entry
+    filepath.write_text("abd")
+    os.utime(path, (mtime + 1, mtime + 1))
+    assert cache.get(path, os.stat(path), 10) is None
+    assert cache.prune() == 1
+    filepath.unlink()
+    cache.clear()
+
+
+def test_hash_dir():
+    root = Path("./test_hash_dir.zarr")
+    (root / "0").mkdir(parents=True)
+    (root / ".zgroup").write_text("{}")
+    (root / "0" / "0").write_bytes(b"chunk")
+    hash, hash_type, size = hash_dir(root)
+    assert hash_type == "md5-d"
+    assert size == 7
+    assert len(hash) == 22
+    # the hash only depends on relative paths and content
+    shutil.copytree(root, "./test_hash_dir_copy.zarr")
+    assert hash_dir("./test_hash_dir_copy.zarr")[0] == hash
+    (root / "0" / "0").write_bytes(b"other")
+    assert hash_dir(root)[0] != hash
+    assert hash_dir("./test_hash_dir_empty")[0] is None
+    shutil.rmtree(root)
+    shutil.rmtree("./test_hash_dir_copy.zarr")
+
+
+def test_hash_dir_cloud(monkeypatch):
+    root = Path("./test_hash_dir_cloud.zarr")
+    (root / "0").mkdir(parents=True)
+    (root / ".zgroup").write_text("{}")
+    (root / "0" / "0").write_bytes(b"chunk")
+    fs = fsspec.filesystem("memory")
+    for path in root.rglob("*"):
+        if path.is_file():
+            relpath = path.relative_to(root).as_posix()
+            fs.pipe(f"/bucket/prefix/x.zarr/{relpath}", path.read_bytes())
+    find = MemoryFileSystem.find
+
+    # object stores report the md5 of an object as its ETag
+    def find_with_etags(self, path, **kwargs):
+        infos = find(self, path, **kwargs)
+        if kwargs.get("detail", False):
+            for key, info in infos.items():
+                info["ETag"] = f'"{hashlib.md5(self.cat_file(key)).hexdigest()}"'
+        return infos
+
+    monkeypatch.setattr(MemoryFileSystem, "find", find_with_etags)
+    # the hash doesn't depend on where the directory is stored
+    hash_cloud = hash_dir(UPath("memory://bucket/prefix/x.zarr"))
+    assert hash_cloud == hash_dir(root)
+    fs.rm("/bucket", recursive=True)
+    shutil.rmtree(root)
+
+
 def test_base64():
     mytest = "test".encode()
     b64_str = to_b64_str(mytest)
@@ -33,3 +135,40 @@ def test_base64():
 
 def test_b16_to_b64():
     assert b16_to_b64("9b89c8c1acf79dba5b5341d1fff9806f") == "m4nIwaz3nbpbU0HR__mAbw"
+
+
+def test_hash_md5s3():
+    filepath = Path("./test_hash_md5s3.txt")
+    content = os.urandom(25)
+    filepath.write_bytes(content)
+    # 3 parts of 10, 10 and 5 bytes
+    digests = b"".join(
+        hashlib.md5(content[i : i + 10]).digest() for i in range(0, 25, 10)
+    )
+    expected = f"{to_b64_str(hashlib.md5(digests).digest())}-3"
+    assert hash_md5s3(filepath, chunk_size=10) == (expected, "md5-n")
+    md5 = to_b64_str(hashlib.md5(content).digest())
+    assert matches_etag_hash(filepath, md5, "md5")
+    assert not matches_etag_hash(filepath, expected, "md5")
+    # with a shared dict, the file is hashed only once for many hashes
+    computed: dict = {}
+    assert not matches_etag_hash(filepath, "x", "md5", computed=computed)
+    filepath.write_bytes(b"")
+    assert matches_etag_hash(filepath, md5, "md5", computed=computed)
+    filepath.unlink()
+
+
+def test_hashing_writer():
+    filepath = Path("./test_hashing_writer.txt")
+    for chunk_size in [10, 1000]:
+        with HashingWriter(filepath, chunk_size=chunk_size) as writer:
+            for _ in range(30):
+                writer.write(os.urandom(7))
+        assert writer.hash_and_type() == hash_file(filepath, chunk_size=chunk_size)
+    # writes out of order can't be hashed
+    with HashingWriter(filepath) as writer:
+        writer.write(b"abc")
+        writer.seek(0)
+        writer.write(b"x")
+    assert writer.hash_and_type() is None
+    filepath.unlink()
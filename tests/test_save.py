@@ -1,21 +1,25 @@
+import threading
+
 import pytest
 
 import lamindb as ln
+from lamindb import _save
 from lamindb._save import prepare_error_message, store_files
 
 
 def test_prepare_error_message():
     ln.dev.datasets.file_mini_csv()
     file = ln.File("mini.csv", description="test")
-    exception = Exception("exception")
+    exceptions = [(file, Exception("exception"))]
 
-    error = prepare_error_message([], [file], exception)
+    error = prepare_error_message([], [file], exceptions)
     assert error.startswith(
         "The following entries have been successfully uploaded and committed to the database"  # noqa
     )
 
-    error = prepare_error_message([file], [], exception)
+    error = prepare_error_message([file], [], exceptions)
     assert error.startswith("No entries were uploaded or committed to the database")
+    assert f"{file.uid}: exception" in error
 
 
 def test_zarr_upload_data_object():
@@ -41,3 +45,58 @@ def test_store_files_acid():
     assert str(error.exconly()).startswith(
         "RuntimeError: No entries were uploaded or committed to the database."
     )
+
+
+def test_save_background():
+    ln.dev.datasets.file_mini_csv()
+    file = ln.File("mini.csv", description="test background")
+    upload = file.save(background=True)
+    upload.wait()
+    assert upload.done()
+    assert file.visibility == 1
+    assert ln.File.filter(description="test background").one() == file
+    assert file.path.exists()
+    file.delete(permanent=True, storage=True)
+
+
+def test_save_background_twice(monkeypatch):
+    ln.dev.datasets.file_mini_csv()
+    file = ln.File("mini.csv", description="test background twice")
+    started = threading.Event()
+    check_and_attempt_upload = _save.check_and_attempt_upload
+
+    def upload_once_started(file, **kwargs):
+        started.wait()
+        return check_and_attempt_upload(file, **kwargs)
+
+    monkeypatch.setattr(_save, "check_and_attempt_upload", upload_once_started)
+    upload = file.save(background=True)
+    # a pending upload isn't started again
+    assert file.save(background=True) is upload
+    started.set()
+    file.save()
+    assert upload.done()
+    assert file.visibility == 1
+    assert ln.File.filter(description="test background twice").one() == file
+    file.delete(permanent=True, storage=True)
+
+
+def test_save_background_failed_cleanup(monkeypatch):
+    ln.dev.datasets.file_mini_csv()
+    file = ln.File("mini.csv", description="test background failed")
+    monkeypatch.setattr(
+        _save, "check_and_attempt_upload", lambda file, **kwargs: Exception("upload")
+    )
+
+    def delete_fails(*args, **kwargs):
+        raise Exception("cleanup")
+
+    monkeypatch.setattr(file, "_delete_skip_storage", delete_fails)
+    upload = file.save(background=True)
+    with pytest.raises(RuntimeError):
+        upload.wait()
+    # the hidden record is deleted although the first cleanup attempt failed
+    assert (
+        ln.File.filter(description="test background failed", visibility=None).count()
+        == 0
+    )
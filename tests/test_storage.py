@@ -1,16 +1,40 @@
+import os
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
 
 import h5py
 import numpy as np
 import pandas as pd
 import pytest
 import zarr
+from numcodecs import Zlib
+from scipy.sparse import csr_matrix
 
 import lamindb as ln
-from lamindb.dev.storage import delete_storage
+from lamindb.dev._hash_cache import HashCache
+from lamindb.dev.storage import UPath, _multipart, delete_storage
+from lamindb.dev.storage._arrow import load_parquet_dataset
 from lamindb.dev.storage._backed_access import backed_access
+from lamindb.dev.storage._cache import (
+    CacheManager,
+    cache_lock,
+    get_cache_manager,
+    is_valid_cache,
+    pinned,
+    synchronize,
+)
+from lamindb.dev.storage._multipart import (
+    MULTIPART_CHUNK_SIZE,
+    UploadJournal,
+    get_chunk_size,
+    upload_multipart,
+)
 from lamindb.dev.storage._zarr import read_adata_zarr, write_adata_zarr
-from lamindb.dev.storage.file import read_adata_h5ad
+from lamindb.dev.storage.file import clone_or_copy, read_adata_h5ad
 from lamindb.dev.storage.object import infer_suffix, write_to_file
 
 
@@ -52,6 +76,7 @@ def test_anndata_io():
     zarr_path = test_file.with_suffix(".zarr")
     write_adata_zarr(adata, zarr_path, callback)
 
+    assert (zarr_path / ".zmetadata").exists()
     adata = read_adata_zarr(zarr_path)
 
     assert adata.shape == (30, 200)
@@ -59,6 +84,33 @@ def test_anndata_io():
     delete_storage(zarr_path)
 
 
+def test_write_adata_zarr_policy():
+    test_file = ln.dev.datasets.anndata_file_pbmc68k_test()
+    adata = read_adata_h5ad(test_file)
+    adata.layers["sparse"] = csr_matrix(adata.X)
+
+    zarr_path = test_file.with_name("pbmc68k_policy.zarr")
+    policy = ln.dev.ZarrWritePolicy(chunk_bytes=1024, compressor="lz4", clevel=1)
+    write_adata_zarr(adata, zarr_path, policy=policy)
+
+    store = zarr.open(zarr_path)
+    assert store["layers"]["sparse"]["indptr"].chunks[0] < adata.n_obs
+    assert store["layers"]["sparse"]["data"].compressor.cname == "lz4"
+    assert store["layers"]["sparse"]["data"].compressor.clevel == 1
+    adata_read = read_adata_zarr(zarr_path)
+    assert adata_read.shape == (30, 200)
+    assert adata_read.layers["sparse"].sum() == pytest.approx(adata.X.sum())
+    delete_storage(zarr_path)
+
+    # the compressor passed by the caller overrides the one of the policy
+    write_adata_zarr(adata, zarr_path, policy=policy, compressor=Zlib(level=3))
+    store = zarr.open(zarr_path)
+    assert isinstance(store["X"].compressor, Zlib)
+    assert isinstance(store["obs"]["_index"].compressor, Zlib)
+    assert read_adata_zarr(zarr_path).shape == (30, 200)
+    delete_storage(zarr_path)
+
+
 @pytest.mark.parametrize("adata_format", ["h5ad", "zarr"])
 def test_backed_access(adata_format):
     fp = ln.dev.datasets.anndata_file_pbmc68k_test()
@@ -77,6 +129,8 @@ def test_backed_access(adata_format):
         del store["obsp"]["test"].attrs["encoding-version"]
         del store["obsm"]["X_pca"].attrs["encoding-type"]
         del store["obsm"]["X_pca"].attrs["encoding-version"]
+        # update the consolidated metadata
+        zarr.consolidate_metadata(store.store)
         del store
 
     with pytest.raises(ValueError):
@@ -138,6 +192,51 @@ def test_backed_access(adata_format):
         delete_storage(fp)
 
 
+@pytest.mark.parametrize("adata_format", ["h5ad", "zarr"])
+def test_backed_write(adata_format):
+    fp = ln.dev.datasets.anndata_file_pbmc68k_test()
+    adata = read_adata_h5ad(fp)
+
+    with backed_access(fp) as access:
+        sub = access[[1, 5, 7, 20]]
+        write_path = sub.write(
+            fp.with_name(f"pbmc68k_sub.{adata_format}"), chunk_size=3
+        )
+
+    if adata_format == "h5ad":
+        adata_sub = read_adata_h5ad(write_path)
+    else:
+        adata_sub = read_adata_zarr(write_path)
+    assert adata_sub.shape == (4, 200)
+    assert adata_sub.obs_names.tolist() == adata.obs_names[[1, 5, 7, 20]].tolist()
+    assert adata_sub.X.sum() == pytest.approx(adata[[1, 5, 7, 20]].X.sum())
+    assert adata_sub.obsp["test"].sum() == 4
+    assert adata_sub.raw.shape == (4, 100)
+
+    delete_storage(write_path)
+
+
+def test_backed_memmap():
+    import anndata as ad
+
+    X = np.arange(60, dtype=np.float32).reshape(10, 6)
+    fp = ln.dev.datasets.anndata_file_pbmc68k_test().with_name("dense.h5ad")
+    ad.AnnData(X=X).write(fp)
+
+    with backed_access(fp) as access:
+        assert isinstance(access.X, np.memmap)
+        assert np.array_equal(access[2:5].X, X[2:5])
+        assert np.array_equal(access[[1, 3], [0, 2]].X, X[np.ix_([1, 3], [0, 2])])
+
+    # compressed arrays are chunked and can't be memory-mapped
+    ad.AnnData(X=X).write(fp, compression="gzip")
+    with backed_access(fp) as access:
+        assert not isinstance(access.X, np.memmap)
+        assert np.array_equal(access[2:5].X, X[2:5])
+
+    delete_storage(fp)
+
+
 def test_infer_suffix():
     import anndata as ad
 
@@ -173,3 +272,334 @@ def test_backed_bad_format(bad_adata_path):
 
     access.close()
     delete_storage(bad_adata_path)
+
+
+def test_upload_journal():
+    localpath = Path("./test_upload_journal.bin")
+    localpath.write_bytes(b"0" * 10)
+    storagepath = UPath("s3://lamindb-ci/test-data/test_upload_journal.bin")
+    journal = UploadJournal(localpath, storagepath)
+    stat = localpath.stat()
+    assert journal.load(stat, 5) is None
+    journal.start("upload_id", stat, 5)
+    journal.add_part(1, "etag1")
+    # a new journal for the same paths resumes the upload
+    resumed = UploadJournal(localpath, storagepath)
+    assert resumed.load(stat, 5) == "upload_id"
+    assert resumed.parts == {"1": "etag1"}
+    # a different part size, a modified file or another storage path make the
+    # journal stale
+    assert resumed.load(stat, 10) is None
+    assert resumed.stale["upload_id"] == "upload_id"
+    other = UPath("s3://lamindb-ci/test-data/test_upload_journal_other.bin")
+    assert UploadJournal(localpath, other).load(stat, 5) is None
+    localpath.write_bytes(b"1" * 20)
+    assert resumed.load(localpath.stat(), 5) is None
+    journal.remove()
+    assert not journal.path.exists()
+    localpath.unlink()
+    # S3 allows at most 10000 parts
+    assert get_chunk_size(10) == MULTIPART_CHUNK_SIZE
+    assert -(-200 * 1024**3 // get_chunk_size(200 * 1024**3)) <= 10000
+
+
+def test_upload_multipart_resume(monkeypatch):
+    monkeypatch.setattr(_multipart, "get_chunk_size", lambda size: 2)
+    localpath = Path("./test_upload_multipart_resume.bin")
+    localpath.write_bytes(b"0" * 10)
+    calls = []
+    failing = {3}
+
+    def call_s3(method, **kwargs):
+        calls.append((method, kwargs.get("PartNumber")))
+        if method == "create_multipart_upload":
+            return {"UploadId": f"upload_id{len(calls)}"}
+        if method == "upload_part":
+            if kwargs["PartNumber"] in failing:
+                raise ConnectionError("dropped connection")
+            return {"ETag": str(kwargs["PartNumber"])}
+        return {}
+
+    def methods():
+        return [method for method, _ in calls]
+
+    fs = SimpleNamespace(
+        call_s3=call_s3,
+        split_path=lambda path: ("bucket", path.split("/")[-1], None),
+        invalidate_cache=lambda path: None,
+    )
+    storagepath = SimpleNamespace(fs=fs, as_posix=lambda: "s3://bucket/key")
+    with pytest.raises(ConnectionError):
+        upload_multipart(localpath, storagepath, max_workers=1, print_progress=False)
+    # after a transient error, the upload isn't aborted and can be resumed
+    assert "abort_multipart_upload" not in methods()
+    uploaded = {number for method, number in calls if method == "upload_part"}
+    failing.clear()
+    calls.clear()
+    upload_multipart(localpath, storagepath, print_progress=False)
+    assert "create_multipart_upload" not in methods()
+    resumed = {number for method, number in calls if method == "upload_part"}
+    assert resumed == {1, 2, 3, 4, 5} - (uploaded - {3})
+    assert methods()[-1] == "complete_multipart_upload"
+    assert not UploadJournal(localpath, storagepath).path.exists()
+    # the upload of a stale journal is aborted, e.g., if the file is uploaded
+    # to another path
+    failing.add(3)
+    with pytest.raises(ConnectionError):
+        upload_multipart(localpath, storagepath, max_workers=1, print_progress=False)
+    failing.clear()
+    calls.clear()
+    other = SimpleNamespace(fs=fs, as_posix=lambda: "s3://bucket/other")
+    upload_multipart(localpath, other, print_progress=False)
+    assert methods()[0] == "abort_multipart_upload"
+    assert methods()[-1] == "complete_multipart_upload"
+    # a cancelled upload is aborted
+
+    def cancel(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(UploadJournal, "add_part", cancel)
+    calls.clear()
+    with pytest.raises(KeyboardInterrupt):
+        upload_multipart(localpath, storagepath, max_workers=1, print_progress=False)
+    assert methods()[-1] == "abort_multipart_upload"
+    assert not UploadJournal(localpath, storagepath).path.exists()
+    localpath.unlink()
+
+
+def test_clone_or_copy():
+    src = Path("./test_clone_or_copy_src.txt")
+    dst = Path("./test_clone_or_copy_dst.txt")
+    src.write_text("content")
+    dst.write_text("stale")
+    assert clone_or_copy(src, dst) in {"reflink", "copy"}
+    assert dst.read_text() == "content"
+    assert not list(Path(".").glob(".test_clone_or_copy_dst.txt.*"))
+    # editing the source doesn't change the destination
+    src.write_text("edited")
+    assert dst.read_text() == "content"
+    src.unlink()
+    dst.unlink()
+
+
+def test_load_parquet_dataset():
+    dfs = [
+        pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}),
+        pd.DataFrame({"a": [3]}),
+        pd.DataFrame({"a": [4, 5]}, index=pd.RangeIndex(10, 14, 2)),
+    ]
+    paths = [Path(f"./test_load_parquet_dataset_{i}.parquet") for i in range(3)]
+    for df, path in zip(dfs, paths):
+        df.to_parquet(path)
+    df = load_parquet_dataset(paths)
+    assert df.index.tolist() == [0, 1, 0, 10, 12]
+    assert np.isnan(df.b.iloc[2])
+    pd.testing.assert_frame_equal(df, pd.concat(dfs))
+    # files that store their indices differently can't be loaded as one dataset
+    pd.DataFrame({"a": [6]}, index=pd.Index(["r"], name="key")).to_parquet(paths[2])
+    with pytest.raises(ValueError):
+        load_parquet_dataset(paths)
+    for path in paths:
+        path.unlink()
+
+
+def test_cache_manager():
+    cache_dir = Path("./test_cache_manager").resolve()
+    (cache_dir / "bucket").mkdir(parents=True)
+    cache_manager = CacheManager(cache_dir)
+    paths = []
+    for i in range(4):
+        path = cache_dir / "bucket" / f"{i}.txt"
+        path.write_bytes(b"0" * 10)
+        cache_manager.record_access(path)
+        paths.append(path)
+    # files outside of the cache aren't managed
+    cache_manager.record_access(Path("./test_cache_manager.txt"))
+    assert cache_manager.total_size() == 40
+    # the least recently used file is evicted unless it's pinned
+    cache_manager.pin(paths[0])
+    cache_manager.record_access(paths[2])
+    assert cache_manager.evict(max_bytes=30) == 10
+    assert paths[0].exists() and not paths[1].exists()
+    cache_manager.unpin(paths[0])
+    assert cache_manager.evict(max_bytes=10) == 20
+    assert [path.exists() for path in paths] == [False, False, True, False]
+    assert cache_manager.total_size() == 10
+    # the running total follows files that are accessed again after a change
+    paths[2].write_bytes(b"0" * 25)
+    cache_manager.record_access(paths[2])
+    assert cache_manager.total_size() == 25
+    # the hash cache lives in the same database
+    assert HashCache(cache_manager.db_path)._connection() is (
+        cache_manager._connection()
+    )
+    shutil.rmtree(cache_dir)
+
+
+def test_pinned():
+    cache_manager = get_cache_manager()
+    path = cache_manager.cache_dir / "test_pinned" / "file.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("content")
+    relpath = "test_pinned/file.txt"
+    with pinned([path, path]):
+        assert cache_manager._pinned().count(relpath) == 2
+    assert relpath not in cache_manager._pinned()
+    shutil.rmtree(path.parent)
+
+
+def test_cache_manager_validation():
+    cache_dir = Path("./test_cache_validation").resolve()
+    (cache_dir / "bucket").mkdir(parents=True)
+    cache_manager = CacheManager(cache_dir)
+    path = cache_dir / "bucket" / "file.txt"
+    path.write_bytes(b"0" * 10)
+    file = SimpleNamespace(hash="hash", hash_type="md5", size=10)
+    assert not cache_manager.is_valid(path, file)
+    cache_manager.record_validation(path, file)
+    assert cache_manager.is_valid(path, file)
+    # the record has another hash, e.g., it was updated
+    assert not cache_manager.is_valid(
+        path, SimpleNamespace(hash="other", hash_type="md5", size=10)
+    )
+    # records without a hash can't be validated
+    assert not cache_manager.is_valid(
+        path, SimpleNamespace(hash=None, hash_type=None, size=10)
+    )
+    # the cached file was modified
+    path.write_bytes(b"1" * 11)
+    assert not cache_manager.is_valid(path, file)
+    shutil.rmtree(cache_dir)
+
+
+def test_is_valid_cache():
+    class RemoteDir:
+        modified = datetime(2023, 1, 1)
+
+        def exists(self):
+            return True
+
+        def is_dir(self):
+            return True
+
+        def rglob(self, pattern):
+            return [self]
+
+        def is_file(self):
+            return True
+
+    class NoRequests:
+        def __getattr__(self, name):
+            raise AssertionError("cached files are validated without requests")
+
+    cache_manager = get_cache_manager()
+    path = cache_manager.cache_dir / "test_is_valid_cache" / "file.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # the ETag hash of the cloud file
+    file = SimpleNamespace(hash="8bcIu6F_HOlI3JefTXCSvA", hash_type="md5", size=10)
+    # nothing is cached
+    assert not is_valid_cache(NoRequests(), path, file)
+    # a copy without a validation, e.g., cached by load_to_memory, with another
+    # content
+    path.write_bytes(b"1" * 10)
+    assert not is_valid_cache(NoRequests(), path, file)
+    assert not cache_manager.has_validation(path)
+    # a copy with the content is validated once by its hash
+    path.write_bytes(b"0" * 10)
+    assert is_valid_cache(NoRequests(), path, file)
+    assert cache_manager.is_valid(path, file)
+    # a recorded validation isn't overruled
+    assert not is_valid_cache(
+        NoRequests(), path, SimpleNamespace(hash="other", hash_type="md5", size=10)
+    )
+    # nothing is recorded for files that aren't cached
+    path.unlink()
+    cache_manager.record_validation(path, file)
+    # directories are validated by modification times
+    dirpath = path.parent / "dir.zarr"
+    dirpath.mkdir()
+    dir_file = SimpleNamespace(hash="hash", hash_type="md5-d", size=10)
+    old = RemoteDir.modified.timestamp() - 10
+    os.utime(dirpath, times=(old, old))
+    assert not is_valid_cache(RemoteDir(), dirpath, dir_file)
+    os.utime(dirpath)
+    assert is_valid_cache(RemoteDir(), dirpath, dir_file)
+    shutil.rmtree(path.parent)
+
+
+def test_cache_lock_synchronize():
+    class RemoteFile:
+        modified = datetime(2023, 1, 1)
+        n_downloads = 0
+
+        def exists(self):
+            return True
+
+        def is_dir(self):
+            return False
+
+        def download_to(self, path, **kwargs):
+            RemoteFile.n_downloads += 1
+            time.sleep(0.1)
+            Path(path).write_bytes(b"0" * 10)
+
+    local_filepath = Path("./test_cache_lock/bucket/file.txt").resolve()
+
+    def stage(_):
+        with cache_lock(local_filepath):
+            synchronize(RemoteFile(), local_filepath)
+        return local_filepath.read_bytes()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        contents = list(executor.map(stage, range(4)))
+    # the file is downloaded once and never seen partially written
+    assert RemoteFile.n_downloads == 1
+    assert contents == [b"0" * 10] * 4
+    assert os.listdir(local_filepath.parent) == ["file.txt"]
+    shutil.rmtree("./test_cache_lock")
+
+
+def test_synchronize_directory():
+    class RemoteFile:
+        def __init__(self, modified):
+            self.modified = modified
+
+        def is_file(self):
+            return True
+
+    class RemoteDir:
+        def __init__(self, files, modified):
+            self.files = files
+            self.modified = modified
+
+        def exists(self):
+            return True
+
+        def is_dir(self):
+            return True
+
+        def rglob(self, pattern):
+            return [RemoteFile(self.modified) for _ in self.files]
+
+        def download_to(self, path, recursive=False, **kwargs):
+            assert recursive
+            for name in self.files:
+                (Path(path) / name).parent.mkdir(parents=True, exist_ok=True)
+                (Path(path) / name).write_text(name)
+
+    local_filepath = Path("./test_synchronize_directory/bucket/data.zarr").resolve()
+    assert synchronize(
+        RemoteDir([".zattrs", "X/0"], datetime(2023, 1, 1)), local_filepath
+    )
+    assert (local_filepath / "X/0").read_text() == "X/0"
+    # an outdated directory is replaced as a whole
+    remote = RemoteDir([".zattrs", "X/1"], datetime(2023, 1, 2))
+    assert synchronize(remote, local_filepath)
+    assert sorted(path.name for path in local_filepath.rglob("*")) == [
+        ".zattrs",
+        "1",
+        "X",
+    ]
+    assert os.listdir(local_filepath.parent) == ["data.zarr"]
+    assert not synchronize(remote, local_filepath)
+    shutil.rmtree("./test_synchronize_directory")